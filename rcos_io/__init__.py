@@ -6,7 +6,7 @@ which handle the different routes, filters, and functionality of the app.
 """
 
 from flask import Flask, render_template, g
-from .services import filters, database, settings
+from .services import filters, database, settings, utils
 
 # Import and register blueprints
 # See https://flask.palletsprojects.com/en/2.2.x/blueprints/
@@ -16,17 +16,28 @@ from .blueprints import auth, meetings, users, projects
 app = Flask(__name__)
 app.config["SECRET_KEY"] = settings.SECRET_KEY
 
+# There are few enough templates to keep every compiled one around (no LRU eviction)
+app.jinja_options = {**app.jinja_options, "cache_size": -1}
+
 # Add these environment variables to the config dictionary
 # so we can access them in templates (config is accessible in all templates)
 app.config["HASURA_CONSOLE_URL"] = settings.HASURA_CONSOLE_URL
 app.config["RAILWAY_PROJECT_URL"] = settings.RAILWAY_PROJECT_URL
 app.config["ENV"] = settings.ENV
 
+# Templates build the same URLs on every render
+app.jinja_env.globals["url_for"] = utils.cached_url_for  # pylint: disable=no-member
+
+# Templates only change on deploy in production, so don't stat them on every render
+if settings.ENV == "production":
+    app.config["TEMPLATES_AUTO_RELOAD"] = False
+    app.jinja_env.auto_reload = False
+
 
 @app.before_request
 def attach_db_client():
-    """Creates a new GQL client and attach it to the every reqest as `g.db_client`."""
-    g.db_client = database.client_factory()
+    """Attaches this thread's GQL session to every request as `g.db_client`."""
+    g.db_client = database.get_thread_client()
 
 
 # Temporary home route
@@ -42,3 +53,9 @@ app.register_blueprint(auth.bp, url_prefix="/")
 app.register_blueprint(projects.bp, url_prefix="/projects")
 app.register_blueprint(meetings.bp, url_prefix="/meetings")
 app.register_blueprint(users.bp, url_prefix="/users")
+
+# Compile every template at startup instead of on its first request
+for template_name in app.jinja_env.list_templates(  # pylint: disable=no-member
+    extensions=("html",)
+):
+    app.jinja_env.get_template(template_name)  # pylint: disable=no-member
@@ -3,11 +3,14 @@ This module contains the authentication blueprint, which stores
 all auth related views and functionality.
 """
 from datetime import date
-import functools
+import hashlib
+import json
 import random
 import string
-from typing import Any, Callable, Dict, List, Optional, TypeVar, Union, cast
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, cast
 from requests import HTTPError
+import wrapt
 
 from flask import (
     current_app,
@@ -20,13 +23,13 @@ from flask import (
     url_for,
     flash,
     abort,
+    make_response,
 )
 from graphql.error import GraphQLError
 from gql.transport.exceptions import TransportQueryError
+from werkzeug.wrappers import Response
 from rcos_io.services import github, discord, email, utils, database, settings
 
-C = TypeVar("C", bound=Callable[..., Any])
-
 
 bp = Blueprint("auth", __name__, template_folder="templates")
 
@@ -37,6 +40,9 @@ def load_logged_in_user():
     Set global user variables
     - is_logged_in
     - user
+    - is_faculty_advisor
+    - is_coordinator_or_above
+    - is_mentor_or_above
     - semesters
     - semester
     for access in views and templates.
@@ -46,14 +52,17 @@ def load_logged_in_user():
 
     user: Optional[Dict[str, Any]] = session.get("user")
 
-    # Fetch and store semester in session if not there or if it's changed
-    if not session.get("semesters"):
-        session["semesters"] = database.get_semesters(g.db_client)
+    # Semesters are cached server-side instead of in the session cookie
+    g.semesters = database.get_semesters_cached(g.db_client)
+
+    # Sessions from before the semesters cache stored the whole list in the cookie
+    session.pop("semesters", None)
 
+    # Store current semester in session if not there or if it's changed
     if not session.get("semester") or session["semester"]["end_date"] < str(
         date.today()
     ):
-        session["semester"] = utils.get_active_semester(session["semesters"])
+        session["semester"] = utils.get_active_semester(g.semesters)
 
     g.is_logged_in = user is not None
     if user is None:
@@ -61,211 +70,268 @@ def load_logged_in_user():
     else:
         g.user = user
 
-        if (
-            "is_mentor_or_above" not in session
-            or "is_coordinator_or_above" not in session
-            or "is_faculty_advisor" not in session
-        ):
-            enrollment = database.get_enrollment(
-                g.db_client, g.user["id"], session["semester"]["id"]
+        # Role flags are cached in the session for the semester they were computed for,
+        # so they are recomputed exactly once per user per semester
+        semester_id = session["semester"]["id"] if session.get("semester") else None
+        if semester_id and session.get("role_flags_semester_id") != semester_id:
+            enrollment = database.get_enrollment(g.db_client, g.user["id"], semester_id)
+            session["is_faculty_advisor"] = bool(
+                enrollment and enrollment["is_faculty_advisor"]
             )
-            if enrollment:
-                session["is_faculty_advisor"] = enrollment["is_faculty_advisor"]
-                session["is_coordinator_or_above"] = (
-                    enrollment["is_coordinator"] or session["is_faculty_advisor"]
-                )
-                # TODO
-                session["is_mentor_or_above"] = session["is_coordinator_or_above"]
-
+            session["is_coordinator_or_above"] = (
+                bool(enrollment and enrollment["is_coordinator"])
+                or session["is_faculty_advisor"]
+            )
+            # TODO
+            session["is_mentor_or_above"] = session["is_coordinator_or_above"]
+            session["role_flags_semester_id"] = semester_id
+
+    # Read the role flags out of the session once so guards and views can just check `g`
+    g.is_faculty_advisor = bool(session.get("is_faculty_advisor"))
+    g.is_coordinator_or_above = bool(session.get("is_coordinator_or_above"))
+    g.is_mentor_or_above = bool(session.get("is_mentor_or_above"))
+
+
+# Flash messages (message, category) and redirect targets used by the guards below
+_LOGIN_ENDPOINT = "auth.login"
+_PROFILE_ENDPOINT = "auth.profile"
+_LOGIN_MESSAGE = ("You must login to view that page!", "danger")
+_VERIFIED_MESSAGE = ("You must verified to view that page!", "danger")
+_RPI_MESSAGE = (
+    "You must be an RPI student, faculty, or alum to view that page!",
+    "danger",
+)
+_MENTOR_MESSAGE = ("You must be a Mentor or above to view this page!", "danger")
+_COORDINATOR_MESSAGE = (
+    "You must be a Coordinator or above to view that page!",
+    "danger",
+)
 
-def login_required(view: C) -> C:
-    """Flask decorator to require that the user is logged in to access the view.
 
-    ```
-    # Example
-    @app.route('/secret')
-    @login_required
-    def secret():
-        return 'Hello logged in users!'
-    ```
-    """
+def _check_logged_in() -> Optional[Response]:
+    """Returns a redirect to the login page if nobody is logged in, otherwise `None`."""
+    if g.user is None:
+        flash(*_LOGIN_MESSAGE)
+        return redirect(url_for(_LOGIN_ENDPOINT, redirect_to=request.path))
 
-    @functools.wraps(view)
-    def wrapped_view(**kwargs: Any):
-        if g.user is None:
-            flash("You must login to view that page!", "danger")
-            return redirect(url_for("auth.login", redirect_to=request.path))
+    return None
 
-        return view(**kwargs)
 
-    return cast(C, wrapped_view)
+def _check_verified() -> Optional[Response]:
+    """Returns a redirect if the logged in user is not verified, otherwise `None`."""
+    response = _check_logged_in()
+    if response is not None:
+        return response
 
+    if not g.user["is_verified"]:
+        flash(*_VERIFIED_MESSAGE)
+        return redirect("/")
 
-def verified_required(view: C) -> C:
-    """Flask decorator to require that the logged in user is verified to access the view.
+    return None
 
-    ```
-    # Example
-    @app.route('/secret')
-    @verified_required
-    def secret():
-        return 'Hello verified users!'
-    ```
-    """
 
-    @login_required
-    @functools.wraps(view)
-    def wrapped_view(**kwargs: Any):
-        if not g.user["is_verified"]:
-            flash("You must verified to view that page!", "danger")
-            return redirect("/")
+def _check_setup() -> Optional[Response]:
+    """Returns a redirect if the logged in user has not finished their profile, otherwise `None`."""
+    response = _check_verified()
+    if response is not None:
+        return response
 
-        return view(**kwargs)
+    # Only worked out for views that require it, not on every request
+    profile_todos = get_profile_todos(g.user)
+    if not profile_todos:
+        return None
 
-    return cast(C, wrapped_view)
+    flash(
+        f"You must finish your profile by {', '.join(profile_todos)}"
+        " before accessing that page!",
+        "danger",
+    )
+    return redirect(url_for(_PROFILE_ENDPOINT))
 
 
-def setup_required(view: C) -> C:
-    """
-    Flask decorator to require that the logged in user has
-    - Discord
-    - GitHub
-    - a secondary email
-    set.
+def _check_rpi() -> Optional[Response]:
+    """Returns a redirect if the logged in user is not an RPI user, otherwise `None`."""
+    response = _check_setup()
+    if response is not None:
+        return response
 
-    ```
-    # Example
-    @app.route('/secret')
-    @setup_required
-    def secret():
-        return 'Hello fully setup users!'
-    ```
-    """
+    if g.user is None or g.user["role"] != "rpi":
+        flash(*_RPI_MESSAGE)
+        return redirect("/")
 
-    @verified_required
-    @functools.wraps(view)
-    def wrapped_view(**kwargs: Any):
-        # Check what is not on the user yet and compile a error message
-        not_done: List[str] = []
-        if not g.user["first_name"]:
-            not_done.append("adding your first name")
-        if not g.user["last_name"]:
-            not_done.append("adding your last name")
-
-        if settings.ENV == "production":
-            if not g.user["discord_user_id"]:
-                not_done.append("linking your Discord")
-            if not g.user["github_username"]:
-                not_done.append("linking your GitHub")
-
-        # TODO: enable secondary emails
-        # if not g.user["secondary_email"]:
-        #     not_done.append("adding your secondary email")
-        # if not g.user["is_secondary_email_verified"]:
-        #     not_done.append("verifying your secondary email")
-
-        if len(not_done) > 0:
-            flash(
-                f"You must finish your profile by {', '.join(not_done)}"
-                " before accessing that page!",
-                "danger",
-            )
-            return redirect(url_for("auth.profile"))
+    return None
 
-        return view(**kwargs)
 
-    return cast(C, wrapped_view)
+def _check_mentor_or_above() -> Optional[Response]:
+    """Returns a redirect if the logged in user is not a Mentor+, otherwise `None`."""
+    response = _check_setup()
+    if response is not None:
+        return response
 
+    if not g.is_mentor_or_above:
+        flash(*_MENTOR_MESSAGE)
+        return redirect("/")
 
-def rpi_required(view: C) -> C:
-    """Flask decorator to require that the logged in user is an RPI user to access the view.
+    return None
 
-    ```
-    # Example
-    @app.route('/secret')
-    @rpi_required
-    def students_only():
-        return 'Hello student!'
-    ```
-    """
 
-    @setup_required
-    @functools.wraps(view)
-    def wrapped_view(**kwargs: Any):
-        if g.user is None or g.user["role"] != "rpi":
-            flash(
-                "You must be an RPI student, faculty, or alum to view that page!",
-                "danger",
-            )
-            return redirect("/")
+def _check_coordinator_or_above() -> Optional[Response]:
+    """Returns a redirect if the logged in user is not a Coordinator+, otherwise `None`."""
+    response = _check_setup()
+    if response is not None:
+        return response
 
-        return view(**kwargs)
+    if not g.is_coordinator_or_above:
+        flash(*_COORDINATOR_MESSAGE)
+        return redirect("/")
 
-    return cast(C, wrapped_view)
+    return None
 
 
-def mentor_or_above_required(view: C) -> C:
+def _guard(check: Callable[[], Optional[Response]]):
     """
-    Flask decorator to require that the logged in user is either currently a
-    - Mentor
-    - Coordinator
-    - Faculty Advisor
-    to access the view.
+    Creates a view decorator that runs `check` before the view and returns
+    its response instead of calling the view if it isn't `None`.
 
-    ```
-    # Example
-    @app.route('/secret')
-    @rpi_required
-    def students_only():
-        return 'Hello student!'
-    ```
+    `wrapt` wraps the view in a single transparent proxy, so every guarded view
+    only pays for one wrapper call no matter how many checks it implies
+    (e.g. `rpi_required` also checks login, verification, and setup).
     """
 
-    @setup_required
-    @functools.wraps(view)
-    def wrapped_view(**kwargs: Any):
-        if not session.get("is_mentor_or_above"):
-            flash(
-                "You must be a Mentor or above to view this page!",
-                "danger",
-            )
-            return redirect("/")
+    @wrapt.decorator
+    def decorator(
+        view: Callable[..., Any],
+        _instance: Any,
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+    ):
+        response = check()
+        if response is not None:
+            return response
+
+        return view(*args, **kwargs)
+
+    return decorator
+
+
+login_required = _guard(_check_logged_in)
+"""Flask decorator to require that the user is logged in to access the view.
+
+```
+# Example
+@app.route('/secret')
+@login_required
+def secret():
+    return 'Hello logged in users!'
+```
+"""
+
+verified_required = _guard(_check_verified)
+"""Flask decorator to require that the logged in user is verified to access the view.
+
+```
+# Example
+@app.route('/secret')
+@verified_required
+def secret():
+    return 'Hello verified users!'
+```
+"""
+
+setup_required = _guard(_check_setup)
+"""
+Flask decorator to require that the logged in user has
+- Discord
+- GitHub
+- a secondary email
+set.
+
+```
+# Example
+@app.route('/secret')
+@setup_required
+def secret():
+    return 'Hello fully setup users!'
+```
+"""
+
+rpi_required = _guard(_check_rpi)
+"""Flask decorator to require that the logged in user is an RPI user to access the view.
+
+```
+# Example
+@app.route('/secret')
+@rpi_required
+def students_only():
+    return 'Hello student!'
+```
+"""
 
-        return view(**kwargs)
+mentor_or_above_required = _guard(_check_mentor_or_above)
+"""
+Flask decorator to require that the logged in user is either currently a
+- Mentor
+- Coordinator
+- Faculty Advisor
+to access the view.
+
+```
+# Example
+@app.route('/secret')
+@mentor_or_above_required
+def mentors_only():
+    return 'Hello mentor!'
+```
+"""
 
-    return cast(C, wrapped_view)
+coordinator_or_above_required = _guard(_check_coordinator_or_above)
+"""
+Flask decorator to require that the logged in user is either currently a
+- Coordinator
+- Faculty Advisor
+to access the view.
+
+```
+# Example
+@app.route('/secret')
+@coordinator_or_above_required
+def coordinators_only():
+    return 'Hello coordinator!'
+```
+"""
 
 
-def coordinator_or_above_required(view: C) -> C:
+def handle_gql_errors(
+    endpoint: str, message: str, category: str = "danger", **url_values: Any
+):
     """
-    Flask decorator to require that the logged in user is either currently a
-    - Mentor
-    - Coordinator
-    - Faculty Advisor
-    to access the view.
+    Creates a view decorator that logs any GraphQL error raised by the view,
+    flashes `message` and redirects to `endpoint` instead of erroring out.
 
     ```
     # Example
-    @app.route('/secret')
-    @rpi_required
-    def students_only():
-        return 'Hello student!'
+    @app.route('/projects')
+    @handle_gql_errors("index", "Yikes! Failed to fetch projects.")
+    def projects():
+        return render_template("projects.html", projects=get_projects())
     ```
     """
 
-    @setup_required
-    @functools.wraps(view)
-    def wrapped_view(**kwargs: Any):
-        if not session.get("is_coordinator_or_above"):
-            flash(
-                "You must be a Coordinator or above to view that page!",
-                "danger",
-            )
-            return redirect("/")
-
-        return view(**kwargs)
+    @wrapt.decorator
+    def decorator(
+        view: Callable[..., Any],
+        _instance: Any,
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+    ):
+        try:
+            return view(*args, **kwargs)
+        except (GraphQLError, TransportQueryError) as error:
+            utils.log_gql_error(error)
+            flash(message, category)
+            return redirect(url_for(endpoint, **url_values))
 
-    return cast(C, wrapped_view)
+    return decorator
 
 
 @bp.route("/login", methods=("GET", "POST"))
@@ -331,12 +397,14 @@ def submit_otp():
     submitted_otp = request.form["otp"]
 
     # Grab and then clear session variables
-    user_otp: Optional[str] = session.pop("user_otp", None)
-    user_email: Optional[str] = session.pop("user_email", None)
-    redirect_to: Optional[str] = session.pop("redirect_to", None)
-
+    # (a single clear() instead of several pops so the session is only modified once)
+    login_session = dict(session)
     session.clear()
 
+    user_otp: Optional[str] = login_session.get("user_otp")
+    user_email: Optional[str] = login_session.get("user_email")
+    redirect_to: Optional[str] = login_session.get("redirect_to")
+
     # This better be set! If it isn't something fishy is up so abort!
     if user_otp is None or user_email is None:
         flash("There was an error logging you in. Please try again later.", "danger")
@@ -350,10 +418,10 @@ def submit_otp():
     ### Correct OTP, time to login! ###
 
     # Find or create the user from the email entered
-    session["user"], is_new_user = database.get_or_create_user_by_email(
+    user, is_new_user = database.get_or_create_user_by_email(
         g.db_client, user_email, "rpi" if "@rpi.edu" in user_email else "external"
     )
-    g.user = session["user"]
+    set_logged_in_user(user)
 
     # Go home OR to the desired path the user tried going to before login
     if redirect_to:
@@ -363,6 +431,7 @@ def submit_otp():
 
 
 @bp.route("/impersonate")
+@handle_gql_errors("index", "No user ID or RCS ID provided.", "warning")
 def impersonate():
     """
     Allows local developers and Coordinators+ in production
@@ -370,26 +439,21 @@ def impersonate():
     """
 
     # Ensure we're running locally OR we're logged in as a coordinator+ in production
-    if settings.ENV != "development" and not session.get("is_coordinator_or_above"):
+    if settings.ENV != "development" and not g.is_coordinator_or_above:
         abort(404)
 
     rcs_id = request.args.get("rcs_id")
     user_id = request.args.get("user_id")
 
     # Find or create the user from the email entered
-    try:
-        user = database.get_user(g.db_client, rcs_id=rcs_id, user_id=user_id)
-    except (GraphQLError, TransportQueryError) as error:
-        current_app.logger.exception(error)
-        flash("No user ID or RCS ID provided.", "warning")
-        return redirect(url_for("index"))
+    user = database.get_user(g.db_client, rcs_id=rcs_id, user_id=user_id)
 
     if user is None:
         flash("User not found.", "danger")
         return redirect(url_for("index"))
 
     session.clear()
-    session["user"] = g.user = user
+    set_logged_in_user(user)
 
     flash(f"Logged in as {user['display_name']}", "info")
     return redirect(url_for("index"))
@@ -443,10 +507,13 @@ def discord_callback():
     try:
         update_logged_in_user({"discord_user_id": discord_user_id})
     except (GraphQLError, TransportQueryError) as error:
-        current_app.logger.exception(error)
+        utils.log_gql_error(error)
         flash("Yikes! Failed to save your Discord link.", "danger")
         return redirect("/")
 
+    # The account may have been linked before with a different username or avatar
+    discord.clear_user_cache(discord_user_id)
+
     flash_message = (
         "Linked Discord account "
         f"@{discord_user_info['username']}#{discord_user_info['discriminator']}"
@@ -514,7 +581,7 @@ def github_callback():
     try:
         update_logged_in_user({"github_username": github_username})
     except (GraphQLError, TransportQueryError) as error:
-        current_app.logger.exception(error)
+        utils.log_gql_error(error)
         flash("Yikes! Failed to save your GitHub link.", "danger")
         return redirect("/")
 
@@ -529,12 +596,26 @@ def profile():
     """Renders the profile form on GET request and updates it on POST."""
 
     if request.method == "GET":
+        # Skip fetching from Discord and rendering if the browser's copy is still current.
+        # Pending flashed messages must be rendered, so never short-circuit then.
+        etag = generate_profile_etag()
+        if "_flashes" not in session and request.if_none_match.contains(etag):
+            response = make_response("", 304)
+            response.set_etag(etag)
+            response.cache_control.private = True
+            response.cache_control.must_revalidate = True
+            return response
+
         # Fetch Discord user profile if linked
         context: Dict[str, Any] = {}
         if g.user["discord_user_id"]:
-            context["discord_user"] = discord.get_user(g.user["discord_user_id"])
+            context["discord_user"] = discord.get_user_cached(g.user["discord_user_id"])
 
-        return render_template("auth/profile.html", **context)
+        response = make_response(render_template("auth/profile.html", **context))
+        response.set_etag(etag)
+        response.cache_control.private = True
+        response.cache_control.must_revalidate = True
+        return response
 
     # HANDLE FORM SUBMISSION
 
@@ -546,6 +627,7 @@ def profile():
             input_name in request.form
             and request.form[input_name].strip()
             and len(request.form[input_name].strip()) > 0
+            and is_changed(input_name, request.form[input_name].strip())
         ):
             updates[input_name] = request.form[input_name].strip()
 
@@ -561,10 +643,12 @@ def profile():
     # Attempt to apply updates in database.
     # This will fail if constraints fails like secondary email is reused
     try:
-        update_logged_in_user(updates)
-        flash("Updated your profile!", "success")
+        if update_logged_in_user(updates):
+            flash("Updated your profile!", "success")
+        else:
+            flash("No changes to save.", "info")
     except (GraphQLError, TransportQueryError) as error:
-        current_app.logger.exception(error)
+        utils.log_gql_error(error)
         flash("There was an error while updating your profile!", "danger")
 
     return redirect(url_for("auth.profile"))
@@ -575,16 +659,28 @@ def profile():
 DEFAULT_OTP_LENGTH = 4
 
 
-def update_logged_in_user(updates: Dict[str, Any]):
+def set_logged_in_user(user: Dict[str, Any]):
+    """Stores the user as the logged in user in `session['user']` and `g.user`."""
+    session["user"] = user
+    g.user = user
+
+
+def update_logged_in_user(updates: Dict[str, Any]) -> bool:
     """
     Updates the logged in user.
 
-    1. Applies DB update
+    1. Applies DB update (skipped if nothing actually changes)
     2. Updates `session['user']` and `g.user`
     3. Updates Discord nickname if linked
+
+    Returns:
+        whether anything changed
     """
-    session["user"] = database.update_user(g.db_client, g.user["id"], updates)
-    g.user = session["user"]
+    updates = {key: value for key, value in updates.items() if is_changed(key, value)}
+    if not updates:
+        return False
+
+    set_logged_in_user(database.update_user(g.db_client, g.user["id"], updates))
 
     # Update Discord nickname
     if g.user["discord_user_id"]:
@@ -597,6 +693,64 @@ def update_logged_in_user(updates: Dict[str, Any]):
             except HTTPError as error:
                 current_app.logger.exception(error)
 
+    return True
+
+
+def is_changed(key: str, value: Any) -> bool:
+    """
+    Determines whether updating the logged in user's `key` to `value` changes anything.
+    Form values are strings, so e.g. `"2025"` doesn't change a graduation year of `2025`.
+    """
+    current = g.user.get(key)
+    if current is None or value is None:
+        return current != value
+    return str(current) != str(value)
+
+
+def get_profile_todos(user: Dict[str, Any]) -> List[str]:
+    """
+    Compiles what the user still has to do before their profile counts as set up,
+    e.g. `["adding your first name", "linking your Discord"]`.
+    An empty list means the user is fully set up.
+    """
+    not_done: List[str] = []
+    if not user["first_name"]:
+        not_done.append("adding your first name")
+    if not user["last_name"]:
+        not_done.append("adding your last name")
+
+    if settings.ENV == "production":
+        if not user["discord_user_id"]:
+            not_done.append("linking your Discord")
+        if not user["github_username"]:
+            not_done.append("linking your GitHub")
+
+    # TODO: enable secondary emails
+    # if not user["secondary_email"]:
+    #     not_done.append("adding your secondary email")
+    # if not user["is_secondary_email_verified"]:
+    #     not_done.append("verifying your secondary email")
+
+    return not_done
+
+
+def generate_profile_etag() -> str:
+    """
+    Generates an ETag for the logged in user's profile page from everything it renders:
+    the user, the current semester, and the Discord user info (which is only refetched
+    every `discord.DISCORD_USER_CACHE_SECONDS`, so the current cache window stands in for it).
+    """
+    state = json.dumps(
+        [
+            g.user,
+            session["semester"]["id"] if session.get("semester") else None,
+            int(time.time() // discord.DISCORD_USER_CACHE_SECONDS),
+        ],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.blake2b(state.encode(), digest_size=8).hexdigest()
+
 
 def generate_otp(length: int = DEFAULT_OTP_LENGTH) -> str:
     """Randomly generates an alphabetic one-time password of the specified length in all caps."""
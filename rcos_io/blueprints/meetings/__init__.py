@@ -5,9 +5,15 @@ This module contains the meetings blueprint, which stores
 all meeting related views and functionality.
 """
 import functools
-from datetime import datetime, timedelta
+import gzip
+import hashlib
+import re
+import time
+from datetime import date, datetime, timedelta, timezone
 from typing import Any, Callable, Dict, List, Optional, Set, TypeVar, cast
 
+import orjson
+
 from flask import (
     Blueprint,
     current_app,
@@ -16,21 +22,54 @@ from flask import (
     redirect,
     render_template,
     request,
-    session,
-    url_for,
 )
 from gql.transport.exceptions import TransportQueryError
 from graphql.error import GraphQLError
+from redis.exceptions import RedisError
 
 from rcos_io.blueprints.auth import (
     rpi_required,
     mentor_or_above_required,
 )
-from rcos_io.services import attendance, database, utils
+from rcos_io.services import attendance, cache, database, loaders, utils
 from . import forms
 
 C = TypeVar("C", bound=Callable[..., Any])
 
+MEETING_TYPES = (
+    "small group",
+    "large group",
+    "workshop",
+    "bonus",
+    "mentors",
+    "coordinators",
+    "other",
+)
+"""All meeting types. This must match the meeting_types enum in the database!"""
+
+MENTOR_MEETING_TYPES = ("workshop",)
+"""The meeting types Mentors are allowed to create."""
+
+MEETING_TYPE_TITLES = {
+    meeting_type: meeting_type.title() for meeting_type in MEETING_TYPES
+}
+"""Display titles of the meeting types, e.g. `"small group"` => `"Small Group"`."""
+
+MEETING_URL_FORMAT = "/meetings/{}".format
+"""Formats a meeting ID into the URL of the meeting's detail page."""
+
+EVENTS_CACHE_SECONDS = 60
+"""How long a Fullcalendar events response is cached in Redis."""
+
+EVENTS_GZIP_MIN_BYTES = 500
+"""Events responses smaller than this aren't worth gzipping."""
+
+MAX_EVENTS_WINDOW = timedelta(days=92)
+"""The largest date range of meetings the events API returns at once."""
+
+ISO_DATE_TIME_REGEX = re.compile(r"^\d{4}-\d{2}-\d{2}(T.+)?$")
+"""Matches ISO 8601 dates (`2022-09-01`) and date times (`2022-09-01T00:00:00-04:00`)."""
+
 bp = Blueprint("meetings", __name__, template_folder="templates")
 
 
@@ -39,18 +78,23 @@ def for_meeting(view: C) -> C:
 
     @functools.wraps(view)
     def wrapped_view(**kwargs: Any):
+        # Malformed IDs can't match a meeting, so don't bother asking the database
+        if not utils.is_uuid(kwargs["meeting_id"]):
+            flash("No meeting with that ID found!", "danger")
+            return redirect(utils.cached_url_for("meetings.index"))
+
         # Attempt to fetch meeting
         try:
-            meeting = database.get_meeting(g.db_client, kwargs["meeting_id"])
+            meeting = loaders.get_meeting(g.db_client, kwargs["meeting_id"])
         except (GraphQLError, TransportQueryError) as error:
-            current_app.logger.exception(error)
+            utils.log_gql_error(error)
             flash("There was an error fetching the meeting.", "warning")
-            return redirect(url_for("meetings.index"))
+            return redirect(utils.cached_url_for("meetings.index"))
 
         # Handle meeting not found
         if meeting is None:
             flash("No meeting with that ID found!", "danger")
-            return redirect(url_for("meetings.index"))
+            return redirect(utils.cached_url_for("meetings.index"))
 
         g.meeting = meeting
         g.semester_id = meeting["semester_id"]
@@ -70,88 +114,119 @@ def index():
 @bp.route("/api/events")
 def events_api():
     """Returns a JSON array of event objects that Fullcalendar can understand."""
-    start = (
-        datetime.fromisoformat(cast(str, request.args.get("start")))
-        if "start" in request.args
-        else None
-    )
-    end = (
-        datetime.fromisoformat(cast(str, request.args.get("end")))
-        if "end" in request.args
-        else None
-    )
+    try:
+        start = (
+            parse_date_time(request.args["start"]) if "start" in request.args else None
+        )
+        end = parse_date_time(request.args["end"]) if "end" in request.args else None
+    except ValueError:
+        return "Invalid start or end date", 400
+
+    # Never return more than MAX_EVENTS_WINDOW worth of meetings
+    if start is None:
+        # Rounded to the day so the default range shares one cache key all day
+        start = datetime.utcnow().replace(
+            hour=0, minute=0, second=0, microsecond=0
+        ) - timedelta(days=30)
+    if end is not None and end < start:
+        return "End date is before start date", 400
+
+    try:
+        if end is None or end - start > MAX_EVENTS_WINDOW:
+            end = start + MAX_EVENTS_WINDOW
+
+        # Snap the range outwards to 5 minute boundaries so slightly different
+        # requests for the same meetings share cache entries
+        start -= timedelta(
+            minutes=start.minute % 5,
+            seconds=start.second,
+            microseconds=start.microsecond,
+        )
+        if end.minute % 5 or end.second or end.microsecond:
+            end += timedelta(
+                minutes=5 - end.minute % 5,
+                seconds=-end.second,
+                microseconds=-end.microsecond,
+            )
+    except (TypeError, OverflowError):
+        # Dates too close to the ends of the calendar to build a range from
+        return "Invalid start or end date", 400
 
-    # Fetch meetings
-    meetings = database.get_meetings(
-        g.db_client, only_published=True, start_at=start, end_at=end
+    events_json = get_events_json(start, end, int(time.time() // EVENTS_CACHE_SECONDS))
+
+    # Let browsers revalidate and skip the download if they already have these events
+    response = current_app.response_class(events_json, mimetype="application/json")
+    response.set_etag(
+        hashlib.blake2b(events_json, digest_size=8).hexdigest(), weak=True
     )
+    response.cache_control.private = True
+    response.cache_control.max_age = 30
+    response.headers["X-Window-Days"] = str((end - start).days)
 
-    # Convert them to objects that Fullcalendar can understand
-    events = list(map(meeting_to_event, meetings))
+    # Event JSON repeats the same keys over and over so it compresses very well
+    response.vary.add("Accept-Encoding")
+    if len(events_json) >= EVENTS_GZIP_MIN_BYTES and "gzip" in request.accept_encodings:
+        response.set_data(gzip.compress(events_json, compresslevel=6))
+        response.headers["Content-Encoding"] = "gzip"
 
-    return events
+    return response.make_conditional(request)
 
 
-@bp.route("/add", methods=("GET", "POST"))
+@bp.route("/add", methods=("GET",))
 @mentor_or_above_required
 def add():
-    """Renders the add meeting form and handles form submissions."""
-    form = forms.MeetingForm()
-    form.type.choices = (
-        [
-            "small group",
-            "large group",
-            "workshop",
-            "bonus",
-            "mentors",
-            "coordinators",
-            "other",
-        ]
-        if session.get("is_coordinator_or_above")
-        else ["workshop"]
-    )
-    if request.method == "GET":
-        form.start_date_time.data = datetime.today()
-        form.end_date_time.data = form.start_date_time.data + timedelta(hours=2)
+    """Renders the add meeting form."""
+    form = create_meeting_form()
+    form.start_date_time.data = datetime.today()
+    form.end_date_time.data = form.start_date_time.data + timedelta(hours=2)
 
-    if form.validate_on_submit():
-        # Mentors can only create workshops
-        if form.type.data == "small_group" and not session["is_mentor_or_above"]:
-            flash("Mentors can only create workshops!", "warning")
-            return redirect(url_for("meetings.index"))
-
-        # Determine the semester from the date
-        semester = utils.get_active_semester(
-            session["semesters"], form.start_date_time.data
-        )
-        if semester is None:
-            flash("The start date is not within any known semester!", "danger")
-            return redirect(url_for("meetings.add"))
-
-        meeting = {
-            "semester_id": semester["id"],
-            "name": form.name.data,
-            "type": form.type.data,
-            "start_date_time": form.start_date_time.data.isoformat(),
-            "end_date_time": form.end_date_time.data.isoformat(),
-            "location": form.location.data,
-        }
-
-        # Attempt to insert meeting into database
-        try:
-            new_meeting = database.insert_meeting(g.db_client, meeting)
-        except (GraphQLError, TransportQueryError) as error:
-            current_app.logger.exception(error)
-            flash("Yikes! Failed to add meeting. Check logs.", "danger")
-            return redirect(url_for("meetings.index"))
+    return render_template("meetings/add.html", form=form)
 
-        # Redirect to the new meeting's detail page
-        return redirect(url_for("meetings.detail", meeting_id=new_meeting["id"]))
 
-    return render_template("meetings/add.html", form=form)
+@bp.route("/add", methods=("POST",))
+@mentor_or_above_required
+def add_submit():
+    """Handles add meeting form submissions."""
+    form = create_meeting_form()
+
+    if not form.validate_on_submit():
+        return render_template("meetings/add.html", form=form)
+
+    # Mentors can only create workshops
+    if form.type.data == "small_group" and not g.is_mentor_or_above:
+        flash("Mentors can only create workshops!", "warning")
+        return redirect(utils.cached_url_for("meetings.index"))
+
+    # Determine the semester from the date
+    semester = utils.get_active_semester(g.semesters, form.start_date_time.data)
+    if semester is None:
+        flash("The start date is not within any known semester!", "danger")
+        return redirect(utils.cached_url_for("meetings.add"))
+
+    meeting = {
+        "semester_id": semester["id"],
+        "name": form.name.data,
+        "type": form.type.data,
+        "start_date_time": form.start_date_time.data.isoformat(),
+        "end_date_time": form.end_date_time.data.isoformat(),
+        "location": form.location.data,
+    }
+
+    # Attempt to insert meeting into database
+    try:
+        new_meeting = database.insert_meeting(g.db_client, meeting)
+    except (GraphQLError, TransportQueryError) as error:
+        utils.log_gql_error(error)
+        flash("Yikes! Failed to add meeting. Check logs.", "danger")
+        return redirect(utils.cached_url_for("meetings.index"))
 
-    # # This list must match the meeting_types enum in the database!
-    # # Mentors can only create workshops
+    # The calendar would not show the new meeting until the cache expired
+    clear_events_cache()
+
+    # Redirect to the new meeting's detail page
+    return redirect(
+        utils.cached_url_for("meetings.detail", meeting_id=new_meeting["id"])
+    )
 
 
 @bp.route("/attend", methods=("GET", "POST"))
@@ -189,7 +264,7 @@ def attend():
     else:
         flash("Invalid attendance code.", "danger")
 
-    return redirect(url_for("meetings.attend"))
+    return redirect(utils.cached_url_for("meetings.attend"))
 
 
 @bp.route("/attendance/verify", methods=["POST"])
@@ -209,7 +284,7 @@ def verify_attendance():
         return "Failed to verify user. Are you sure the RCS ID is spelled correct?", 400
 
     # get the user ID from RCS ID
-    user = database.get_user(g.db_client, user_id=user_id)
+    user = loaders.get_user(g.db_client, user_id=user_id)
     if user is None:
         return "Can't find user with that RCS ID!", 400
 
@@ -223,7 +298,7 @@ def verify_attendance():
 @for_meeting
 def detail(meeting_id: str):
     """Renders the detail page for a particular meeting."""
-    g.context["can_open_attendance"] = session.get("is_mentor_or_above")
+    g.context["can_open_attendance"] = g.is_mentor_or_above
 
     return render_template(
         "meetings/detail.html",
@@ -235,20 +310,7 @@ def detail(meeting_id: str):
 @for_meeting
 def edit(meeting_id: str):
     """Renders the edit page for a particular meeting."""
-    form = forms.MeetingForm(data=g.meeting)
-    form.type.choices = (
-        [
-            "small group",
-            "large group",
-            "workshop",
-            "bonus",
-            "mentors",
-            "coordinators",
-            "other",
-        ]
-        if session.get("is_coordinator_or_above")
-        else ["workshop"]
-    )
+    form = create_meeting_form(g.meeting)
 
     if isinstance(form.start_date_time.data, str):
         form.start_date_time.data = datetime.fromisoformat(form.start_date_time.data)
@@ -258,8 +320,9 @@ def edit(meeting_id: str):
     if form.validate_on_submit():
         form.populate_obj(g.meeting)
         database.update_meeting(g.db_client, meeting_id, g.meeting)
+        clear_events_cache()
         flash("Updated meeting.", "info")
-        return redirect(url_for("meetings.detail", meeting_id=meeting_id))
+        return redirect(utils.cached_url_for("meetings.detail", meeting_id=meeting_id))
 
     return render_template("meetings/edit.html", **g.context, form=form)
 
@@ -288,7 +351,9 @@ def meeting_attendance(meeting_id: str):
     # If we have a small group ID, make sure it's real
     if small_group_id and not small_group:
         flash("Small group not found.", "warning")
-        return redirect(url_for("meetings.meeting_attendance", meeting_id=meeting_id))
+        return redirect(
+            utils.cached_url_for("meetings.meeting_attendance", meeting_id=meeting_id)
+        )
 
     # Get this meeting's attendances
     attendances = database.get_attendances(
@@ -338,45 +403,36 @@ def open_attendance(meeting_id: str):
     # For type checking since g does not have types
     context: Dict[str, Any] = g.context
     meeting: Dict[str, Any] = g.meeting
-    semester_id: str = g.semester_id
 
     # If we're opening a small group attendance room, get the ID of the room
     if meeting["type"] == "small group":
         user: Dict[str, Any] = g.user
 
-        # Find this mentor's small group
+        # Find this mentor's small group in the meeting's semester
         try:
             small_group = database.get_mentor_small_group(
-                g.db_client, semester_id, user["id"]
+                g.db_client, g.semester_id, user["id"]
             )
-            if small_group is None:
-                raise utils.NotFoundError()
-
-            small_group_id: str = small_group["id"]
         except (GraphQLError, TransportQueryError) as error:
-            current_app.logger.exception(error)
-            flash(
-                f"There was an error fetching the small group room for user {user['id']}.",
-                "warning",
-            )
-            return redirect(url_for("meetings.index"))
-        except utils.NotFoundError as error:
-            current_app.logger.exception(error)
+            utils.log_gql_error(error)
+            flash("There was an error fetching your small group.", "warning")
+            return redirect(utils.cached_url_for("meetings.index"))
+
+        if small_group is None:
             flash(
                 "You aren't mentoring a small group, creating a generic attendance code instead.",
                 "warning",
             )
+        else:
+            small_group_id = small_group["id"]
 
     # If we're in a small group room, look for <meeting_id>:<small_group_id>. If not,
     # then find <meeting_id>:default. The latter keyword determines how many unique
     # sessions can be opened. For instance, if there are 10 small group rooms, 10
     # unique sessions rooms can be opened.
-    if not attendance.room_exists(meeting_id, small_group_id):
-        context["code"] = attendance.register_room(
-            meeting["location"], meeting_id, small_group_id
-        )
-    else:
-        context["code"] = attendance.get_code_for_room(meeting_id, small_group_id)
+    context["code"] = attendance.register_or_get_room(
+        meeting["location"], meeting_id, small_group_id
+    )
 
     return render_template("meetings/open.html", **context)
 
@@ -389,17 +445,114 @@ def close(meeting_id: str):
     code = request.form["code"]
     attendance.close_room(code)
 
-    return redirect(url_for("meetings.detail", meeting_id=meeting_id))
+    return redirect(utils.cached_url_for("meetings.detail", meeting_id=meeting_id))
+
+
+def parse_date_time(value: str) -> datetime:
+    """
+    Parses an ISO 8601 date or date time like the ones Fullcalendar sends.
+    Dates are parsed as midnight on that day. Date times with a UTC offset are
+    converted to naive UTC so they can be compared with dates and each other.
+
+    Raises:
+        ValueError: if the value is not an ISO 8601 date or date time
+    """
+    if not ISO_DATE_TIME_REGEX.match(value):
+        raise ValueError(f"Invalid ISO 8601 date or date time: {value}")
+
+    if "T" not in value:
+        return datetime.combine(date.fromisoformat(value), datetime.min.time())
 
+    # fromisoformat() only understands the "Z" UTC suffix as of Python 3.11
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
 
-def meeting_to_event(meeting: Dict[str, Any]) -> Dict[str, Any]:
-    """Creates a Fullcalendar event object from a meeting."""
-    meeting_type = cast(str, meeting["type"]).title()
+
+@functools.lru_cache(maxsize=256)
+def get_events_json(start: datetime, end: datetime, time_bucket: int) -> bytes:
+    """
+    Returns the JSON encoded Fullcalendar events for the published meetings
+    starting in the given range.
+
+    Cached in this process and then in Redis, since Fullcalendar requests the same date
+    ranges over and over. `time_bucket` changes every `EVENTS_CACHE_SECONDS` so the
+    in-process cache expires along with Redis, even for changes made in other workers.
+    """
+    cache_key = f"events:{start.isoformat()}:{end.isoformat()}"
+    try:
+        events_json: Optional[bytes] = cache.get_cache().get(cache_key)
+    except RedisError as error:
+        # The calendar still works without Redis, it just always asks Hasura
+        current_app.logger.warning("Failed to read cached events: %s", error)
+        events_json = None
+    if events_json is not None:
+        return events_json
+
+    # Fetch meetings
+    meetings = database.get_meetings(
+        g.db_client, only_published=True, start_at=start, end_at=end
+    )
+
+    # Convert them to objects that Fullcalendar can understand
+    events = [
+        meeting_to_event(
+            meeting["id"],
+            meeting["name"],
+            meeting["type"],
+            meeting["start_date_time"],
+            meeting["end_date_time"],
+        )
+        for meeting in meetings
+    ]
+
+    # orjson encodes straight to bytes, much faster than the stdlib json module
+    events_json = orjson.dumps(events)
+    try:
+        cache.get_cache().setex(cache_key, EVENTS_CACHE_SECONDS, events_json)
+    except RedisError as error:
+        current_app.logger.warning("Failed to cache events: %s", error)
+    return events_json
+
+
+@functools.lru_cache(maxsize=4096)
+def meeting_to_event(
+    meeting_id: str,
+    name: Optional[str],
+    meeting_type: str,
+    start_date_time: str,
+    end_date_time: str,
+) -> Dict[str, Any]:
+    """
+    Creates a Fullcalendar event object from a meeting's fields.
+
+    The same meetings show up in many overlapping date ranges so events are memoized.
+    The returned dict is shared between calls and must not be modified.
+    """
     return {
-        "id": meeting["id"],
-        "title": meeting["name"] or meeting_type,
-        "start": meeting["start_date_time"],
-        "end": meeting["end_date_time"],
-        "url": f"/meetings/{meeting['id']}",
+        "id": meeting_id,
+        "title": name or MEETING_TYPE_TITLES.get(meeting_type) or meeting_type.title(),
+        "start": start_date_time,
+        "end": end_date_time,
+        "url": MEETING_URL_FORMAT(meeting_id),
         "color": "red",  # TODO: reflect meeting type
     }
+
+
+def clear_events_cache():
+    """Clears the cached Fullcalendar events after meetings are added or changed."""
+    get_events_json.cache_clear()
+    try:
+        cache.delete_pattern("events:*")
+    except RedisError as error:
+        current_app.logger.warning("Failed to clear cached events: %s", error)
+
+
+def create_meeting_form(meeting: Optional[Dict[str, Any]] = None) -> forms.MeetingForm:
+    """Creates a meeting form with the meeting types the logged in user may choose from."""
+    form = forms.MeetingForm(data=meeting)
+    form.type.choices = (
+        MEETING_TYPES if g.is_coordinator_or_above else MENTOR_MEETING_TYPES
+    )
+    return form
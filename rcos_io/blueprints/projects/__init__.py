@@ -4,7 +4,7 @@ all project related views and functionality.
 """
 from collections import defaultdict
 import functools
-from typing import Any, Callable, DefaultDict, Dict, List, TypeVar, cast
+from typing import Any, Callable, DefaultDict, Dict, List, Optional, TypeVar, cast
 from flask import (
     Blueprint,
     request,
@@ -13,19 +13,64 @@ from flask import (
     redirect,
     session,
     flash,
-    url_for,
     Markup,
-    current_app,
 )
-import bleach
-import markdown
+import cmarkgfm
+from cmarkgfm.cmark import Options as CmarkOptions
+import nh3
 from graphql.error import GraphQLError
 from gql.transport.exceptions import TransportQueryError
-from rcos_io.services import utils, database
+from rcos_io.services import utils, database, loaders
 from rcos_io.blueprints import auth
 
 C = TypeVar("C", bound=Callable[..., Any])
 
+ALLOWED_TAGS = frozenset(
+    (
+        "b",
+        "i",
+        "p",
+        "h1",
+        "h2",
+        "h3",
+        "h4",
+        "h5",
+        "a",
+        "code",
+        "ul",
+        "li",
+        "ol",
+        "em",
+        "strong",
+        "del",
+        "pre",
+        "table",
+        "thead",
+        "tbody",
+        "tr",
+        "th",
+        "td",
+    )
+)
+"""The HTML tags allowed to remain in rendered project descriptions."""
+
+ALLOWED_ATTRIBUTES = {
+    "a": {"href", "title"},
+    "pre": {"lang"},
+    "code": {"class"},
+    "th": {"align"},
+    "td": {"align"},
+}
+"""The HTML attributes allowed to remain on tags in rendered project descriptions."""
+
+ALLOWED_URL_SCHEMES = frozenset(("http", "https", "mailto"))
+"""The URL schemes links in rendered project descriptions may use."""
+
+DESCRIPTION_CLEANER = nh3.Cleaner(
+    tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, url_schemes=ALLOWED_URL_SCHEMES
+)
+"""Sanitizer for rendered project descriptions, built once and shared by all threads."""
+
 bp = Blueprint("projects", __name__, template_folder="templates")
 
 
@@ -34,31 +79,39 @@ def for_project(view: C) -> C:
 
     @functools.wraps(view)
     def wrapped_view(**kwargs: Any):
+        # Malformed IDs can't match a project, so don't bother asking the database
+        if not utils.is_uuid(kwargs["project_id"]):
+            flash("No such project with that ID exists!", "warning")
+            return redirect(utils.cached_url_for("projects.index"))
+
         # Attempt to fetch meeting
         try:
-            project = database.get_project(g.db_client, kwargs["project_id"])
+            project = loaders.get_project(g.db_client, kwargs["project_id"])
         except (GraphQLError, TransportQueryError) as error:
-            current_app.logger.exception(error)
+            utils.log_gql_error(error)
             flash("There was an error fetching the project.", "warning")
-            return redirect(url_for("projects.index"))
+            return redirect(utils.cached_url_for("projects.index"))
 
         # Handle project not found or not approved
         if project is None or (
-            not project["is_approved"] and not session.get("is_coordinator_or_above")
+            not project["is_approved"] and not g.is_coordinator_or_above
         ):
             flash("No such project with that ID exists!", "warning")
-            return redirect(url_for("projects.index"))
+            return redirect(utils.cached_url_for("projects.index"))
 
+        # Determine if the logged in user is currently a project lead
+        # A user has at most one enrollment per semester, so stop at the first match
         is_project_lead = False
-        for enrollment in project["enrollments"]:
-            # Determine if the logged in user is currently a project lead
-            if (
-                g.is_logged_in
-                and session.get("semester")
-                and enrollment["semester_id"] == session.get("semester")["id"]
-                and enrollment["user_id"] == session.get("user")["id"]
-            ):
-                is_project_lead = enrollment["is_project_lead"]
+        if g.is_logged_in and session.get("semester"):
+            semester_id = session["semester"]["id"]
+            user_id = g.user["id"]
+            for enrollment in project["enrollments"]:
+                if (
+                    enrollment["semester_id"] == semester_id
+                    and enrollment["user_id"] == user_id
+                ):
+                    is_project_lead = enrollment["is_project_lead"]
+                    break
 
         g.project = project
         g.is_project_lead = is_project_lead
@@ -69,21 +122,23 @@ def for_project(view: C) -> C:
 
 
 @bp.route("/")
+@auth.handle_gql_errors(
+    "index", "Yikes! There was an error while fetching the projects."
+)
 def index():
     """
     Get all projects for a specific semester OR for all semesters.
     """
 
     # Search term to filter projects on
-    # TODO: use it!
     search = request.args.get("search")
 
     # Fetch target semester ID from url or default to current active one (which might not exist)
     try:
-        semester_id, semester = utils.get_target_semester(request, session)
+        semester_id, semester = utils.get_target_semester(request, session, g.semesters)
     except utils.NotFoundError:
         flash("No such semester found!", "warning")
-        return redirect(url_for("projects.index", semester_id="all"))
+        return redirect(utils.cached_url_for("projects.index", semester_id="all"))
 
     is_looking_for_members = (
         True
@@ -100,22 +155,18 @@ def index():
     }
 
     # Attempt to fetch APPROVED projects
-    try:
-        context["projects"] = database.get_projects(
-            g.db_client,
-            False,
-            semester_id=semester_id,
-            is_looking_for_members=is_looking_for_members,
-        )
-    except (GraphQLError, TransportQueryError) as error:
-        current_app.logger.exception(error)
-        flash("Yikes! There was an error while fetching the projects.", "danger")
-        return redirect(url_for("index"))
-
-    # Only coordinators+ need to know about unapproved projects
-    if session.get("is_coordinator_or_above"):
-        context["unapproved_projects"] = database.get_projects(
-            g.db_client, False, is_approved=False
+    context["projects"] = database.get_projects(
+        g.db_client,
+        False,
+        semester_id=semester_id,
+        is_looking_for_members=is_looking_for_members,
+        search=search,
+    )
+
+    # Only coordinators+ need to know how many projects are unapproved
+    if g.is_coordinator_or_above:
+        context["unapproved_projects_count"] = database.count_unapproved_projects(
+            g.db_client
         )
 
     return render_template("projects/index.html", **context)
@@ -139,7 +190,14 @@ def add():
     description_markdown = request.form["description_markdown"]
 
     # Parse tags from comma-separated string and wrap in quotes to form postgres strings
-    tags = list(set(f'"{s.strip().lower()}"' for s in request.form["tags"].split(",")))
+    # Duplicates and empty tags are dropped while keeping the order they were entered in
+    tags = list(
+        dict.fromkeys(
+            f'"{tag}"'
+            for tag in (s.strip().lower() for s in request.form["tags"].split(","))
+            if tag
+        )
+    )
 
     user: Dict[str, Any] = g.user
     project_data = {
@@ -153,9 +211,9 @@ def add():
     try:
         inserted_project = database.add_project(g.db_client, project_data)
     except (GraphQLError, TransportQueryError) as error:
-        current_app.logger.exception(error)
+        utils.log_gql_error(error)
         flash("Oops! There was en error while submitting the project.", "danger")
-        return redirect(url_for("projects.index"))
+        return redirect(utils.cached_url_for("projects.index"))
     #
     #   TODO: send approval request to Discord
     #
@@ -167,7 +225,9 @@ def add():
         "success",
     )
 
-    return redirect(url_for("projects.detail", project_id=inserted_project["id"]))
+    return redirect(
+        utils.cached_url_for("projects.detail", project_id=inserted_project["id"])
+    )
 
 
 @bp.route("/approve", methods=("GET", "POST"))
@@ -181,9 +241,9 @@ def approve():
             )
 
         except (GraphQLError, TransportQueryError) as error:
-            current_app.logger.exception(error)
+            utils.log_gql_error(error)
             flash("Yikes! There was an error while fetching the projects.", "danger")
-            return redirect(url_for("projects.index"))
+            return redirect(utils.cached_url_for("projects.index"))
 
         return render_template(
             "projects/approve.html", unapproved_projects=unapproved_projects
@@ -202,7 +262,7 @@ def approve():
         or target_project_action not in ("approve", "deny")
     ):
         flash("Invalid action.", "danger")
-        return redirect(url_for("projects.approve"))
+        return redirect(utils.cached_url_for("projects.approve"))
 
     # Apply action
     if target_project_action == "approve":
@@ -211,7 +271,7 @@ def approve():
         # TODO: actually deny project
         flash(f"Denied user {target_project_id}", "info")
 
-    return redirect(url_for("projects.approve"))
+    return redirect(utils.cached_url_for("projects.approve"))
 
 
 @bp.route("/<project_id>")
@@ -221,42 +281,17 @@ def detail(project_id: str):
 
     # Group enrollments by semesters
     enrollments_by_semester_id: DefaultDict[str, List[Dict[str, Any]]] = defaultdict(
-        lambda: []
+        list
     )
 
     for enrollment in g.project["enrollments"]:
         enrollments_by_semester_id[enrollment["semester_id"]].append(enrollment)
 
-    # Sanitize the project's markdown description to remove any sketchy HTML
-    # This prevents Cross-Site Scripting (XSS) attacks (hopefully...)
-    compiled_md = markdown.markdown(g.project["description_markdown"])
-    g.project["description_markdown"] = Markup(
-        bleach.clean(
-            compiled_md,
-            tags=[
-                "b",
-                "i",
-                "p",
-                "h1",
-                "h2",
-                "h3",
-                "h4",
-                "h5",
-                "a",
-                "code",
-                "ul",
-                "li",
-                "ol",
-                "em",
-                "strong",
-            ],
-        )
-    )
-
     return render_template(
         "projects/detail.html",
         **g.context,
         enrollments_by_semester_id=enrollments_by_semester_id,
+        description_html=render_project_description(g.project["description_markdown"]),
     )
 
 
@@ -268,7 +303,7 @@ def add_member(project_id: str):
 
     if not g.is_project_lead:
         flash("Only current project leads can add team members!", "danger")
-        return redirect(url_for("projects.detail", project_id=project_id))
+        return redirect(utils.cached_url_for("projects.detail", project_id=project_id))
 
     semester_id = request.form["semester_id"]
     user_identifier = request.form["user_identifier"]
@@ -279,7 +314,7 @@ def add_member(project_id: str):
 
     if user is None:
         flash("Student not found!", "danger")
-        return redirect(url_for("projects.detail", project_id=project_id))
+        return redirect(utils.cached_url_for("projects.detail", project_id=project_id))
 
     # TODO: error handle
     database.set_enrollment(
@@ -293,4 +328,26 @@ def add_member(project_id: str):
     )
 
     flash(f"Added {user['display_name']} to the team!", "success")
-    return redirect(url_for("projects.detail", project_id=project_id))
+    return redirect(utils.cached_url_for("projects.detail", project_id=project_id))
+
+
+@functools.lru_cache(maxsize=1024)
+def render_project_description(description_markdown: Optional[str]) -> Markup:
+    """
+    Compiles a project's markdown description to sanitized HTML.
+
+    Results are cached by the markdown itself, so an edited description is
+    simply a cache miss and popular projects skip cmark and nh3 entirely.
+    """
+
+    # Freshly proposed projects often have no description yet
+    if not description_markdown or description_markdown.isspace():
+        return Markup("")
+
+    # Sanitize the project's markdown description to remove any sketchy HTML
+    # This prevents Cross-Site Scripting (XSS) attacks (hopefully...)
+    # Raw HTML is kept (CMARK_OPT_UNSAFE) since nh3 sanitizes it right after
+    compiled_md = cmarkgfm.github_flavored_markdown_to_html(
+        description_markdown, options=CmarkOptions.CMARK_OPT_UNSAFE
+    )
+    return Markup(DESCRIPTION_CLEANER.clean(compiled_md))
@@ -8,21 +8,24 @@ from flask import (
     render_template,
     request,
     redirect,
-    url_for,
     flash,
     g,
     session,
-    current_app,
 )
 from graphql.error import GraphQLError
 from gql.transport.exceptions import TransportQueryError
-from rcos_io.services import database, discord, utils
-from rcos_io.blueprints.auth import coordinator_or_above_required, login_required
+from rcos_io.services import database, discord, loaders, utils
+from rcos_io.blueprints.auth import (
+    coordinator_or_above_required,
+    handle_gql_errors,
+    login_required,
+)
 
 bp = Blueprint("users", __name__, template_folder="templates")
 
 
 @bp.route("/")
+@handle_gql_errors("users.index", "Yikes! Failed to fetch users.", semester_id="all")
 def index():
     """
     Gets all users enrolled for a specific semester OR for all semesters.
@@ -31,15 +34,14 @@ def index():
     """
 
     # Search term to filter users on
-    # TODO: use it!
     search = request.args.get("search")
 
     # Fetch target semester ID from url or default to current active one (which might not exist)
     try:
-        semester_id, semester = utils.get_target_semester(request, session)
+        semester_id, semester = utils.get_target_semester(request, session, g.semesters)
     except utils.NotFoundError:
         flash("No such semester found!", "warning")
-        return redirect(url_for("users.index", semester_id="all"))
+        return redirect(utils.cached_url_for("users.index", semester_id="all"))
 
     # Values passed to template
     context: Dict[str, Any] = {
@@ -48,16 +50,13 @@ def index():
         "semester": semester,
     }
 
-    try:
-        context["users"] = database.get_users(g.db_client, semester_id=semester_id)
-    except (GraphQLError, TransportQueryError) as error:
-        current_app.logger.exception(error)
-        flash("Yikes! Failed to fetch users.", "danger")
-        return redirect(url_for("users.index", semester_id="all"))
+    context["users"] = database.get_users(
+        g.db_client, semester_id=semester_id, search=search
+    )
 
-    # Only coordinators+ need to know about unverified users
-    if session.get("is_coordinator_or_above"):
-        context["unverified_users"] = database.get_users(g.db_client, is_verified=False)
+    # Only coordinators+ need to know how many users are unverified
+    if g.is_coordinator_or_above:
+        context["unverified_users_count"] = database.count_unverified_users(g.db_client)
 
     return render_template("users/index.html", **context)
 
@@ -71,11 +70,11 @@ def verify():
         try:
             unverified_users = database.get_users(g.db_client, is_verified=False)
         except (GraphQLError, TransportQueryError) as error:
-            current_app.logger.exception(error)
+            utils.log_gql_error(error)
             flash(
                 "Yikes! There was an error while fetching unverified users.", "danger"
             )
-            return redirect(url_for("users.index"))
+            return redirect(utils.cached_url_for("users.index"))
 
         return render_template("users/verify.html", unverified_users=unverified_users)
 
@@ -91,7 +90,7 @@ def verify():
         or target_user_action not in ("verify", "delete")
     ):
         flash("Invalid action.", "danger")
-        return redirect(url_for("users.verify"))
+        return redirect(utils.cached_url_for("users.verify"))
 
     # Apply action
     if target_user_action == "verify":
@@ -101,32 +100,31 @@ def verify():
         # TODO: actually delete user
         flash(f"Deleted user {target_user_id}", "info")
 
-    return redirect(url_for("users.verify"))
+    return redirect(utils.cached_url_for("users.verify"))
 
 
 @bp.route("/<user_id>")
+@handle_gql_errors("index", "That is not a valid user ID!", "warning")
 def detail(user_id: str):
     """Renders a specific user's profile."""
 
-    try:
-        user = database.get_user(g.db_client, user_id=user_id, include_enrollments=True)
-    except (GraphQLError, TransportQueryError) as error:
-        current_app.logger.exception(error)
+    # Malformed IDs can't match a user, so don't bother asking the database
+    if not utils.is_uuid(user_id):
         flash("That is not a valid user ID!", "warning")
-        return redirect(url_for("index"))
+        return redirect(utils.cached_url_for("index"))
+
+    user = loaders.get_user(g.db_client, user_id=user_id, include_enrollments=True)
 
     # User might be found or not found
     # Also, only show unverified users to admins so they can approve or deny them
-    if user is None or (
-        not user["is_verified"] and not session.get("is_coordinator_or_above")
-    ):
+    if user is None or (not user["is_verified"] and not g.is_coordinator_or_above):
         flash("No user exists with that ID!", "warning")
-        return redirect(url_for("index"))
+        return redirect(utils.cached_url_for("index"))
 
-    if user["discord_user_id"]:
-        discord_user = discord.get_user(user["discord_user_id"])
-    else:
-        discord_user = None
+    # The Discord account is only shown to verified users, so don't look it up otherwise
+    discord_user = None
+    if user["discord_user_id"] and g.is_logged_in and g.user["is_verified"]:
+        discord_user = discord.get_user_cached(user["discord_user_id"])
 
     return render_template(
         "users/detail.html",
@@ -17,6 +17,21 @@ from rcos_io.services import cache, database
 ATTENDANCE_CODE_LENGTH = 6
 EXPIRATION_MINUTES = 30
 
+# Atomically returns the open room's code, or stores the new room and returns its code.
+# KEYS: {meeting_id}:{small_group_id}, new code
+# ARGV: new code, new attendance session JSON, expiration in seconds
+REGISTER_OR_GET_ROOM_SCRIPT = cache.get_cache().register_script(
+    """
+    local existing_code = redis.call('GET', KEYS[1])
+    if existing_code then
+        return existing_code
+    end
+    redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+    return ARGV[1]
+    """
+)
+
 
 @dataclass
 class AttendanceSession:
@@ -44,11 +59,15 @@ def generate_code(code_length: int = ATTENDANCE_CODE_LENGTH):
     return code
 
 
-def register_room(
+def register_or_get_room(
     room_id: str, meeting_id: str, small_group_id: str = "default"
 ) -> str:
     """
-    Registers a new attendance room.
+    Returns the code of the open attendance room for the meeting & small group,
+    registering a new room first if there isn't one.
+
+    Done in a single Redis call, so two people opening the same room at once
+    can't both register one.
     """
     code = generate_code()
 
@@ -60,16 +79,15 @@ def register_room(
         datetime.datetime.now().timestamp(),
     )
 
-    # code => attendance session
-    cache.get_cache().set(code, json.dumps(dataclasses.asdict(session)))
-    cache.get_cache().expire(code, 60 * EXPIRATION_MINUTES)
-
-    # {meeting_id}:{small_group_id} => code
-    key = f"{meeting_id}:{small_group_id}"
-    cache.get_cache().set(key, code)
-    cache.get_cache().expire(key, 60 * EXPIRATION_MINUTES)
-
-    return code
+    room_code: bytes = REGISTER_OR_GET_ROOM_SCRIPT(
+        keys=[f"{meeting_id}:{small_group_id}", code],
+        args=[
+            code,
+            json.dumps(dataclasses.asdict(session)),
+            60 * EXPIRATION_MINUTES,
+        ],
+    )
+    return room_code.decode("utf-8")
 
 
 def record_attendance(client: Client, user_id: str, meeting_id: str):
@@ -113,23 +131,6 @@ def get_room(code: str):
     return cast(Dict[str, Any], json.loads(room))
 
 
-def get_code_for_room(meeting_id: str, small_group_id: str):
-    """Get the attendance code for a room."""
-    code: Optional[bytes] = cache.get_cache().get(f"{meeting_id}:{small_group_id}")
-    if code is None:
-        return None
-
-    return code.decode("utf-8")
-
-
-def room_exists(meeting_id: str, small_group_id: str) -> bool:
-    """Checks if there is an open attendance session for that meeting & small group room"""
-    key = f"{meeting_id}:{small_group_id}"
-    room: Optional[bytes] = cache.get_cache().get(key)
-
-    return room is not None
-
-
 def validate_code(code: str, user_id: str, rcs_id: str):
     """
     Attempt to verify if an attendance code is correct. Randomly selects some
@@ -20,3 +20,14 @@ else:
 def get_cache():
     """Returns an instance of the Redis client."""
     return redisdb
+
+
+def delete_pattern(pattern: str):
+    """
+    Deletes every key matching the glob-style pattern, e.g. `"events:*"`.
+
+    Uses `SCAN` instead of `KEYS` so Redis isn't blocked while searching.
+    """
+    keys = list(redisdb.scan_iter(match=pattern))
+    if keys:
+        redisdb.delete(*keys)
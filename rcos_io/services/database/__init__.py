@@ -9,9 +9,9 @@ the data we want without every writing code to explain how
 to actually fetch that data from the database!
 
 We use a simple Python package called `gql` to help us
-make authenticated requests to our Hasura API. We make
-a new connection to Hasura for every request that comes
-to the Flask webserver instead of sharing a connection
+make authenticated requests to our Hasura API. Every thread
+of the Flask webserver keeps its own open connection to Hasura
+which is reused across requests instead of sharing a connection
 across threads because that crashes.
 
 Learn how to write Hasura GQL queries (fetch data):
@@ -21,7 +21,10 @@ Learn how to write Hasura GQL mutations (update data):
 https://hasura.io/docs/latest/mutations/postgres/index/
 """
 
+import threading
+import weakref
 from gql import Client
+from gql.client import SyncClientSession
 from gql.transport.requests import RequestsHTTPTransport
 from rcos_io.services import settings
 
@@ -36,12 +39,15 @@ from .attendance import *
 from .small_group import *
 
 
+_thread_local = threading.local()
+
+
 def client_factory():
     """
     Creates a new GQL client pointing to the Hasura API.
 
-    Instead of using one client across the app, one client should be made per request
-    to avoid threading errors.
+    Instead of using one client across the app, one client should be made per thread
+    to avoid threading errors (see `get_thread_client`).
 
     Returns:
         new GQL client
@@ -53,3 +59,25 @@ def client_factory():
         headers={"x-hasura-admin-secret": settings.HASURA_ADMIN_SECRET},
     )
     return Client(transport=transport, fetch_schema_from_transport=False)
+
+
+def get_thread_client() -> SyncClientSession:
+    """
+    Returns this thread's connected GQL session, creating it on first use.
+
+    `Client.execute` opens and closes a new HTTP connection (TCP + TLS handshake)
+    for every query, while a connected session keeps one open across requests.
+    The session has the same `execute` method as a client so it can be passed
+    to every function in this package in place of one.
+    """
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        client = client_factory()
+        session = client.connect_sync()
+        _thread_local.session = session
+
+        # Close the connection once the thread is gone so servers that
+        # start a thread per request (or recycle them) don't leak connections
+        weakref.finalize(threading.current_thread(), client.close_sync)
+
+    return session
@@ -4,35 +4,53 @@ from typing import Any, Dict, List, Optional, cast
 from gql import Client, gql
 
 
-def insert_attendance(client: Client, user_id: str, meeting_id: str):
-    """
-    Insert an attendance for a meeting.
+_INSERT_ATTENDANCE_QUERY = gql(
     """
-    query = gql(
-        """
-        mutation InsertAttendance($meeting_id: uuid!, $user_id: uuid!) {
-            insert_meeting_attendances_one(
-                object: {meeting_id: $meeting_id, user_id: $user_id},
-                on_conflict: {
-                    constraint: meeting_attendances_pkey,
-                    update_columns: []
-                }
-            ) {
-                meeting_id
-                user_id
+    mutation InsertAttendance($meeting_id: uuid!, $user_id: uuid!) {
+        insert_meeting_attendances_one(
+            object: {meeting_id: $meeting_id, user_id: $user_id},
+            on_conflict: {
+                constraint: meeting_attendances_pkey,
+                update_columns: []
             }
+        ) {
+            meeting_id
+            user_id
         }
+    }
+"""
+)
+
+
+def insert_attendance(client: Client, user_id: str, meeting_id: str):
+    """
+    Insert an attendance for a meeting.
     """
-    )
 
     result = client.execute(
-        query,
+        _INSERT_ATTENDANCE_QUERY,
         variable_values={"user_id": user_id, "meeting_id": meeting_id},
     )
 
     return result["insert_meeting_attendances_one"]
 
 
+_GET_ATTENDANCES_QUERY = gql(
+    """
+    query get_attendances($where_clause: meeting_attendances_bool_exp!) {
+        meeting_attendances(where: $where_clause) {
+            user {
+                id
+                display_name
+            }
+            is_manually_added
+            created_at
+        }
+    }
+    """
+)
+
+
 def get_attendances(
     client: Client,
     meeting_id: Optional[str] = None,
@@ -57,19 +75,7 @@ def get_attendances(
             }
         }
 
-    query = gql(
-        """
-        query get_attendances($where_clause: meeting_attendances_bool_exp!) {
-            meeting_attendances(where: $where_clause) {
-                user {
-                    id
-                    display_name
-                }
-                is_manually_added
-                created_at
-            }
-        }
-        """
+    result = client.execute(
+        _GET_ATTENDANCES_QUERY, variable_values={"where_clause": where_clause}
     )
-    result = client.execute(query, variable_values={"where_clause": where_clause})
     return cast(List[Dict[str, Any]], result["meeting_attendances"])
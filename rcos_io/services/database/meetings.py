@@ -6,6 +6,26 @@ from typing import Any, Dict, List, Optional
 from gql import Client, gql
 
 
+_GET_MEETINGS_QUERY = gql(
+    """
+    query meetings($where_clause: meetings_bool_exp!) {
+        meetings(where: $where_clause) {
+            id
+            name
+            type
+            start_date_time
+            end_date_time
+            meeting_attendances_aggregate {
+                aggregate {
+                    count
+                }
+            }
+        }
+    }
+    """
+)
+
+
 def get_meetings(
     client: Client,
     only_published: bool,
@@ -27,79 +47,67 @@ def get_meetings(
             {"start_date_time": {"_lte": end_at.isoformat()}},
         ]
 
-    query = gql(
-        """
-        query meetings($where_clause: meetings_bool_exp!) {
-            meetings(where: $where_clause) {
-                id
-                name
-                type
-                start_date_time
-                end_date_time
-                meeting_attendances_aggregate {
-                    aggregate {
-                        count
-                    }
-                }
-            }
-        }
-        """
+    result = client.execute(
+        _GET_MEETINGS_QUERY, variable_values={"where_clause": where_clause}
     )
-    result = client.execute(query, variable_values={"where_clause": where_clause})
     return result["meetings"]
 
 
-def get_meeting(client: Client, meeting_id: str) -> Optional[Dict[str, Any]]:
-    """Fetches a particular meeting by it's ID."""
-    query = gql(
-        """
-        query find_meeting_by_id($meeting_id: uuid!) {
-            meeting: meetings_by_pk(id:$meeting_id) {
+_GET_MEETING_QUERY = gql(
+    """
+    query find_meeting_by_id($meeting_id: uuid!) {
+        meeting: meetings_by_pk(id:$meeting_id) {
+            id
+            semester {
                 id
-                semester {
-                    id
-                    name
-                }
-                semester_id
                 name
-                type
-                start_date_time
-                end_date_time
-                location
-                created_at
-                host {
-                    id
-                    display_name
-                }
-                meeting_attendances_aggregate {
-                    aggregate {
-                        count
-                    }
+            }
+            semester_id
+            name
+            type
+            start_date_time
+            end_date_time
+            location
+            created_at
+            host {
+                id
+                display_name
+            }
+            meeting_attendances_aggregate {
+                aggregate {
+                    count
                 }
             }
         }
-        """
-    )
-    meeting = client.execute(query, variable_values={"meeting_id": meeting_id})[
-        "meeting"
-    ]
+    }
+    """
+)
+
+
+def get_meeting(client: Client, meeting_id: str) -> Optional[Dict[str, Any]]:
+    """Fetches a particular meeting by it's ID."""
+    meeting = client.execute(
+        _GET_MEETING_QUERY, variable_values={"meeting_id": meeting_id}
+    )["meeting"]
     return meeting
 
 
+_INSERT_MEETING_QUERY = gql(
+    """
+    mutation add_meeting($meeting_data: meetings_insert_input!) {
+        insert_meetings_one(object: $meeting_data) {
+            id
+        }
+    }
+    """
+)
+
+
 def insert_meeting(client: Client, meeting_data: Dict[str, Any]) -> Dict[str, Any]:
     """Inserts a new meeting into the DB."""
-    query = gql(
-        """
-        mutation add_meeting($meeting_data: meetings_insert_input!) {
-            insert_meetings_one(object: $meeting_data) {
-                id
-            }
-        }
-        """
-    )
-    new_meeting = client.execute(query, variable_values={"meeting_data": meeting_data})[
-        "insert_meetings_one"
-    ]
+    new_meeting = client.execute(
+        _INSERT_MEETING_QUERY, variable_values={"meeting_data": meeting_data}
+    )["insert_meetings_one"]
     return new_meeting
 
 
@@ -1,63 +1,116 @@
 """
 This module contains database CRUD operations for projects.
 """
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, cast
 from gql import Client, gql
 
+from rcos_io.services import utils
+
+
+_GET_PROJECT_QUERY = gql(
+    """
+    query GetProject($pid: uuid!) {
+        project: projects_by_pk(id: $pid) {
+            id
+            is_approved
+            name
+            tags
+            github_repos
+            short_description
+            description_markdown
+            enrollments(order_by: [
+                {semester_id: desc},
+                {is_project_lead: desc},
+                {user: {display_name: asc}}
+            ]) {
+                semester_id
+                semester {
+                    name
+                }
+                credits
+                user_id
+                is_project_lead
+                user {
+                    id
+                    rcs_id
+                    display_name
+                }
+            }
+        }
+    }
+    """
+)
+
 
 def get_project(client: Client, project_id: str) -> Optional[Dict[str, Any]]:
     """
     Fetches the project with the given ID.
     Returns project name, participants, description, tags and relevant repos.
     """
-    query = gql(
-        """
-        query GetProject($pid: uuid!) {
-            project: projects_by_pk(id: $pid) {
+
+    result = client.execute(_GET_PROJECT_QUERY, variable_values={"pid": project_id})
+    return result["project"]
+
+
+_GET_PROJECTS_QUERY = gql(
+    """
+    query SemesterProjects(
+        $projects_where_exp: projects_bool_exp,
+        $enrollments_where_exp: enrollments_bool_exp,
+        $withEnrollments: Boolean!
+    ) {
+      projects(order_by: {name: asc}, where: $projects_where_exp) {
+        id
+        name
+        tags
+        github_repos
+        short_description
+        created_at
+        project_leads: enrollments(where: {_and:
+            [$enrollments_where_exp, {is_project_lead: {_eq:true}}]
+        }) @include(if: $withEnrollments) {
+            user_id
+            user {
+                display_name
+            }
+        }
+        enrollments_aggregate(where: $enrollments_where_exp) {
+            aggregate {
+                count
+            }
+        }
+        enrollments(where: $enrollments_where_exp) @include(if: $withEnrollments) {
+            user {
                 id
-                is_approved
-                name
-                tags
-                github_repos
-                short_description
-                description_markdown
-                enrollments(order_by: [
-                    {semester_id: desc},
-                    {is_project_lead: desc},
-                    {user: {display_name: asc}}
-                ]) {
-                    semester_id
-                    semester {
-                        name
-                    }
-                    credits
-                    user_id
-                    is_project_lead
-                    user {
-                        id
-                        rcs_id
-                        display_name
-                    }
-                }
+                display_name
+                graduation_year
             }
+            is_project_lead
+            credits
         }
-        """
-    )
-
-    result = client.execute(query, variable_values={"pid": project_id})
-    return result["project"]
+        owner {
+            id
+            display_name
+        }
+      }
+    }
+"""
+)
 
 
-def get_projects(
+def get_projects(  # pylint: disable=too-many-arguments
     client: Client,
     with_enrollments: bool,
     semester_id: Optional[str] = None,
     is_approved: Optional[bool] = True,
     is_looking_for_members: Optional[bool] = None,
+    search: Optional[str] = None,
 ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
     """
     Fetches all projects in the current semester.
     Returns project name.
+    If `search` is given, only projects whose name or short description contains it
+    are returned.
     """
 
     projects_where_exp: Dict[str, Any] = {}
@@ -72,54 +125,15 @@ def get_projects(
     if is_looking_for_members is not None:
         projects_where_exp["is_looking_for_members"] = {"_eq": is_looking_for_members}
 
-    query = gql(
-        """
-        query SemesterProjects(
-            $projects_where_exp: projects_bool_exp,
-            $enrollments_where_exp: enrollments_bool_exp,
-            $withEnrollments: Boolean!
-        ) {
-          projects(order_by: {name: asc}, where: $projects_where_exp) {
-            id
-            name
-            tags
-            github_repos
-            short_description
-            created_at
-            is_approved
-            project_leads: enrollments(where: {_and:
-                [$enrollments_where_exp, {is_project_lead: {_eq:true}}]
-            }) @include(if: $withEnrollments) {
-                user_id
-                user {
-                    display_name
-                }
-            }
-            enrollments_aggregate(where: $enrollments_where_exp) {
-                aggregate {
-                    count
-                }
-            }
-            enrollments(where: $enrollments_where_exp) @include(if: $withEnrollments) {
-                user {
-                    id
-                    display_name
-                    graduation_year
-                }
-                is_project_lead
-                credits
-            }
-            owner {
-                id
-                display_name
-            }
-          }
-        }
-    """
-    )
+    if search:
+        pattern = utils.ilike_contains(search)
+        projects_where_exp["_or"] = [
+            {"name": {"_ilike": pattern}},
+            {"short_description": {"_ilike": pattern}},
+        ]
 
     result = client.execute(
-        query,
+        _GET_PROJECTS_QUERY,
         variable_values={
             "projects_where_exp": projects_where_exp,
             "enrollments_where_exp": enrollments_where_exp,
@@ -130,28 +144,77 @@ def get_projects(
     return result["projects"]
 
 
-def add_project(client: Client, project_data: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Creates new project with name=name and description=desc where owner is user that has id=owner_id
+_COUNT_UNAPPROVED_PROJECTS_QUERY = gql(
     """
-    query = gql(
-        """
-        mutation AddProject($project_data: projects_insert_input!) {
-            insert_projects_one(object: $project_data) {
-                id
+    query count_unapproved_projects {
+        projects_aggregate(where: {is_approved: {_eq: false}}) {
+            aggregate {
+                count
             }
         }
+    }
+    """
+)
+
+
+def count_unapproved_projects(client: Client) -> int:
+    """Counts the projects that are waiting to be approved without fetching them."""
+    result = client.execute(_COUNT_UNAPPROVED_PROJECTS_QUERY)
+    return cast(int, result["projects_aggregate"]["aggregate"]["count"])
+
+
+_ADD_PROJECT_QUERY = gql(
+    """
+    mutation AddProject($project_data: projects_insert_input!) {
+        insert_projects_one(object: $project_data) {
+            id
+        }
+    }
+"""
+)
+
+
+def add_project(client: Client, project_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Creates new project with name=name and description=desc where owner is user that has id=owner_id
     """
-    )
 
     result = client.execute(
-        query,
+        _ADD_PROJECT_QUERY,
         variable_values={"project_data": project_data},
     )
 
     return result["insert_projects_one"]
 
 
+_ADD_PROJECT_LEAD_QUERY = gql(
+    """
+    mutation AddProjectLead(
+        $project_id: uuid!,
+        $user_id: uuid!,
+        $semester_id: String!,
+        $credits: Int!
+    ) {
+        insert_enrollments_one(
+            object: {
+                is_project_lead: true,
+                user_id: $user_id,
+                project_id: $project_id,
+                semester_id: $semester_id,
+                credits: $credits
+            },
+            on_conflict: {
+                constraint: enrollments_pkey,
+                update_columns: [ project_id, is_project_lead ]
+            }
+        ) {
+            project_id
+        }
+    }
+"""
+)
+
+
 def add_project_lead(
     client: Client, project_id: str, user_id: str, semester_id: str, credit_count: int
 ):
@@ -159,35 +222,9 @@ def add_project_lead(
     Adds user with id=user_id as project lead of project with id=project_id.
     Also adds corresponding enrollment to current semester.
     """
-    query = gql(
-        """
-        mutation AddProjectLead(
-            $project_id: uuid!,
-            $user_id: uuid!,
-            $semester_id: String!,
-            $credits: Int!
-        ) {
-            insert_enrollments_one(
-                object: {
-                    is_project_lead: true,
-                    user_id: $user_id,
-                    project_id: $project_id,
-                    semester_id: $semester_id,
-                    credits: $credits
-                },
-                on_conflict: {
-                    constraint: enrollments_pkey,
-                    update_columns: [ project_id, is_project_lead ]
-                }
-            ) {
-                project_id
-            }
-        }
-    """
-    )
 
     result = client.execute(
-        query,
+        _ADD_PROJECT_LEAD_QUERY,
         variable_values={
             "project_id": project_id,
             "user_id": user_id,
@@ -1,26 +1,49 @@
 """
 This module contains database CRUD operations for semesters.
 """
+import time
 from typing import List, Dict, Any
 from gql import Client, gql
 
+SEMESTERS_CACHE_SECONDS = 60 * 10
+"""How long the list of semesters is kept in memory before being refetched."""
+
+_semesters_cache: Dict[str, Any] = {"semesters": None, "expires_at": 0.0}
+
+
+_GET_SEMESTERS_QUERY = gql(
+    """
+    query semesters {
+        semesters(order_by: {start_date: asc_nulls_last}) {
+            id
+            name
+            type
+            start_date
+            end_date
+            is_open_to_new_projects
+        }
+    }
+    """
+)
+
 
 def get_semesters(client: Client) -> List[Dict[str, Any]]:
     """Fetches all semesters, ordered ascendingly by start date."""
-    query = gql(
-        """
-        query semesters {
-            semesters(order_by: {start_date: asc_nulls_last}) {
-                id
-                name
-                type
-                start_date
-                end_date
-                is_open_to_new_projects
-            }
-        }
-        """
-    )
 
-    semesters = client.execute(query)["semesters"]
+    semesters = client.execute(_GET_SEMESTERS_QUERY)["semesters"]
     return semesters
+
+
+def get_semesters_cached(client: Client) -> List[Dict[str, Any]]:
+    """
+    Same as `get_semesters` but keeps the result in memory for `SEMESTERS_CACHE_SECONDS`
+    since semesters rarely change and are needed on every request.
+    """
+    if (
+        _semesters_cache["semesters"] is None
+        or time.monotonic() >= _semesters_cache["expires_at"]
+    ):
+        _semesters_cache["semesters"] = get_semesters(client)
+        _semesters_cache["expires_at"] = time.monotonic() + SEMESTERS_CACHE_SECONDS
+
+    return _semesters_cache["semesters"]
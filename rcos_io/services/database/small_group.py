@@ -4,46 +4,52 @@ from typing import Any, Dict, List, Optional, cast
 from gql import Client, gql
 
 
+_GET_SMALL_GROUP_QUERY = gql(
+    """
+    query small_group($small_group_id: uuid!) {
+        small_groups_by_pk(id: $small_group_id) {
+            id
+            name
+            location
+            semester_id
+        }
+    }
+    """
+)
+
+
 def get_small_group(client: Client, small_group_id: str):
     """Fetches a particular small group by its id."""
-    query = gql(
-        """
-        query small_group($small_group_id: uuid!) {
-            small_groups_by_pk(id: $small_group_id) {
+    result = client.execute(
+        _GET_SMALL_GROUP_QUERY, variable_values={"small_group_id": small_group_id}
+    )
+    return cast(Optional[Dict[str, Any]], result["small_groups_by_pk"])
+
+
+_GET_MENTOR_SMALL_GROUP_QUERY = gql(
+    """
+    query GetMentorRoom($semester_id: String!, $user_id: uuid!) {
+        small_group_mentors(where: {
+            small_group: {semester_id: {_eq: $semester_id}},
+            user_id: {_eq: $user_id }
+        }) {
+  	            small_group_id
+            small_group {
                 id
                 name
                 location
-                semester_id
             }
         }
-        """
-    )
-    result = client.execute(query, variable_values={"small_group_id": small_group_id})
-    return cast(Optional[Dict[str, Any]], result["small_groups_by_pk"])
+    }
+    """
+)
 
 
 def get_mentor_small_group(client: Client, semester_id: str, user_id: str):
     """Get the small group that a user is mentoring for."""
-    query = gql(
-        """
-        query GetMentorRoom($semester_id: String!, $user_id: uuid!) {
-            small_group_mentors(where: {
-                small_group: {semester_id: {_eq: $semester_id}},
-                user_id: {_eq: $user_id }
-            }) {
-  	            small_group_id
-                small_group {
-                    id
-                    name
-                    location
-                }
-            }
-        }
-        """
-    )
 
     result = client.execute(
-        query,
+        _GET_MENTOR_SMALL_GROUP_QUERY,
         variable_values={"semester_id": semester_id, "user_id": user_id},
     )
     if len(result["small_group_mentors"]) == 0:
@@ -52,28 +58,33 @@ def get_mentor_small_group(client: Client, semester_id: str, user_id: str):
     return cast(Dict[str, Any], result["small_group_mentors"][0]["small_group"])
 
 
-def get_small_group_enrollments(client: Client, small_group_id: str):
-    """Fetches the users enrolled in a specific small group."""
-    query = gql(
-        """
-        query small_group_users($small_group_id: uuid!) {
-            small_groups_by_pk(id: $small_group_id) {
-                small_group_projects {
-                    project {
-                        enrollments {
-                            user {
-                                id
-                                display_name
-                            }
+_GET_SMALL_GROUP_ENROLLMENTS_QUERY = gql(
+    """
+    query small_group_users($small_group_id: uuid!) {
+        small_groups_by_pk(id: $small_group_id) {
+            small_group_projects {
+                project {
+                    enrollments {
+                        user {
+                            id
+                            display_name
                         }
                     }
                 }
             }
         }
-    """
-    )
+    }
+"""
+)
+
 
-    result = client.execute(query, variable_values={"small_group_id": small_group_id})
+def get_small_group_enrollments(client: Client, small_group_id: str):
+    """Fetches the users enrolled in a specific small group."""
+
+    result = client.execute(
+        _GET_SMALL_GROUP_ENROLLMENTS_QUERY,
+        variable_values={"small_group_id": small_group_id},
+    )
     # Flatten the result into a list of enrollments
     enrollments: List[Dict[str, Any]] = []
 
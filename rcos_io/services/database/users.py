@@ -4,39 +4,45 @@ This module contains database CRUD operations for users.
 from typing import Any, Dict, List, Optional, Tuple, cast
 from gql import Client, gql
 
+from rcos_io.services import utils
 from . import fragments
 
 
+_GET_USERS_QUERY = gql(
+    """
+    query semester_users($where: users_bool_exp!) {
+        users(order_by: [
+            { display_name:asc_nulls_last}, {email: asc_nulls_last}
+        ], where: $where) {
+            id
+            display_name
+            role
+            email
+            created_at
+            rcs_id
+            graduation_year
+            github_username
+            enrollments_aggregate {
+                aggregate {
+                    count
+                }
+            }
+        }
+    }
+    """
+)
+
+
 def get_users(
     client: Client,
     semester_id: Optional[str] = None,
     is_verified: Optional[bool] = True,
+    search: Optional[str] = None,
 ):
-    """Fetches users for a particular semester, or ALL users if semester_id is None."""
-    query = gql(
-        """
-        query semester_users($where: users_bool_exp!) {
-            users(order_by: [
-                { display_name:asc_nulls_last}, {email: asc_nulls_last}
-            ], where: $where) {
-                id
-                display_name
-                role
-                email
-                created_at
-                rcs_id
-                graduation_year
-                github_username
-                is_verified
-                enrollments_aggregate {
-                    aggregate {
-                        count
-                    }
-                }
-            }
-        }
-        """
-    )
+    """
+    Fetches users for a particular semester, or ALL users if semester_id is None.
+    If `search` is given, only users whose name, RCS ID, or email contains it are returned.
+    """
 
     where_clause: Dict[str, Any] = {"is_verified": {"_eq": True}}
 
@@ -46,10 +52,37 @@ def get_users(
     if is_verified is not None:
         where_clause["is_verified"] = {"_eq": is_verified}
 
-    result = client.execute(query, variable_values={"where": where_clause})
+    if search:
+        pattern = utils.ilike_contains(search)
+        where_clause["_or"] = [
+            {"display_name": {"_ilike": pattern}},
+            {"rcs_id": {"_ilike": pattern}},
+            {"email": {"_ilike": pattern}},
+        ]
+
+    result = client.execute(_GET_USERS_QUERY, variable_values={"where": where_clause})
     return cast(List[Dict[str, Any]], result["users"])
 
 
+_COUNT_UNVERIFIED_USERS_QUERY = gql(
+    """
+    query count_unverified_users {
+        users_aggregate(where: {is_verified: {_eq: false}}) {
+            aggregate {
+                count
+            }
+        }
+    }
+    """
+)
+
+
+def count_unverified_users(client: Client) -> int:
+    """Counts the users who are waiting to be verified without fetching them."""
+    result = client.execute(_COUNT_UNVERIFIED_USERS_QUERY)
+    return cast(int, result["users_aggregate"]["aggregate"]["count"])
+
+
 def get_or_create_user_by_email(
     client: Client, email: str, role: str
 ) -> Tuple[Dict[str, Any], bool]:
@@ -71,6 +104,32 @@ def get_or_create_user_by_email(
     return user, False
 
 
+_GET_USER_QUERY = gql(
+    fragments.BASIC_USER_DATA_FRAGMENT_INLINE
+    + """
+    query get_user($where_clause: users_bool_exp!, $include_enrollments: Boolean!) {
+        users(limit: 1, where: $where_clause) {
+            ...basicUser
+            enrollments @include(if: $include_enrollments) {
+                credits
+                project {
+                    id
+                    name
+                }
+                semester {
+                    id
+                    name
+                }
+                is_project_lead
+                is_coordinator
+                is_faculty_advisor
+            }
+        }
+    }
+"""
+)
+
+
 def get_user(
     client: Client,
     user_id: Optional[str] = None,
@@ -106,33 +165,8 @@ def get_user(
         raise RuntimeError("No user identifier passed.")
 
     # First attempt to find user via email
-    query = gql(
-        fragments.BASIC_USER_DATA_FRAGMENT_INLINE
-        + """
-        query get_user($where_clause: users_bool_exp!, $include_enrollments: Boolean!) {
-            users(limit: 1, where: $where_clause) {
-                ...basicUser
-                enrollments @include(if: $include_enrollments) {
-                    credits
-                    project {
-                        id
-                        name
-                    }
-                    semester {
-                        id
-                        name
-                    }
-                    is_project_lead
-                    is_coordinator
-                    is_faculty_advisor
-                }
-            }
-        }
-    """
-    )
-
     users: List[Dict[str, Any]] = client.execute(
-        query,
+        _GET_USER_QUERY,
         variable_values={
             "where_clause": where_clause,
             "include_enrollments": include_enrollments,
@@ -144,6 +178,21 @@ def get_user(
     return cast(Dict[str, Any], users[0])
 
 
+_CREATE_USER_WITH_EMAIL_QUERY = gql(
+    fragments.BASIC_USER_DATA_FRAGMENT_INLINE
+    + """
+    mutation insert_user($user: users_insert_input!) {
+        insert_users_one(object: $user, on_conflict: {
+            constraint: users_email_key,
+            update_columns: []
+        }) {
+            ...basicUser
+        }
+    }
+    """
+)
+
+
 def create_user_with_email(client: Client, email: str, role: str):
     """
     Creates a new user with the given email and role.
@@ -157,19 +206,6 @@ def create_user_with_email(client: Client, email: str, role: str):
     Returns:
         newly created user
     """
-    query = gql(
-        fragments.BASIC_USER_DATA_FRAGMENT_INLINE
-        + """
-        mutation insert_user($user: users_insert_input!) {
-            insert_users_one(object: $user, on_conflict: {
-                constraint: users_email_key,
-                update_columns: []
-            }) {
-                ...basicUser
-            }
-        }
-        """
-    )
     user_values = {"email": email, "role": role, "is_verified": role == "rpi"}
 
     # Extract RCS ID from RPI email
@@ -177,13 +213,27 @@ def create_user_with_email(client: Client, email: str, role: str):
         rcs_id = email.replace("@rpi.edu", "")
         user_values["rcs_id"] = rcs_id
 
-    user: Dict[str, Any] = client.execute(query, variable_values={"user": user_values})[
-        "insert_users_one"
-    ]
+    user: Dict[str, Any] = client.execute(
+        _CREATE_USER_WITH_EMAIL_QUERY, variable_values={"user": user_values}
+    )["insert_users_one"]
 
     return user
 
 
+_UPDATE_USER_QUERY = gql(
+    fragments.BASIC_USER_DATA_FRAGMENT_INLINE
+    + """
+    mutation update_user($user_id: uuid!, $updates: users_set_input!) {
+        update_users(_set: $updates, where: { id :{_eq: $user_id}}) {
+            returning {
+            ...basicUser
+            }
+        }
+    }
+    """
+)
+
+
 def update_user(
     client: Client, user_id: str, updates: Dict[str, Any]
 ) -> Dict[str, Any]:
@@ -197,46 +247,37 @@ def update_user(
     Returns:
         updated user data
     """
-    query = gql(
-        fragments.BASIC_USER_DATA_FRAGMENT_INLINE
-        + """
-        mutation update_user($user_id: uuid!, $updates: users_set_input!) {
-            update_users(_set: $updates, where: { id :{_eq: $user_id}}) {
-                returning {
-                ...basicUser
-                }
-            }
-        }
-        """
-    )
 
     user = client.execute(
-        query, variable_values={"user_id": user_id, "updates": updates}
+        _UPDATE_USER_QUERY, variable_values={"user_id": user_id, "updates": updates}
     )["update_users"]["returning"][0]
     return user
 
 
+_GET_ENROLLMENT_QUERY = gql(
+    """
+    query get_enrollment($user_id: uuid!, $semester_id: String!) {
+        enrollments(
+            limit: 1,
+            where: { user_id: { _eq: $user_id }, semester_id: { _eq: $semester_id } }
+        ) {
+            is_project_lead
+            is_coordinator
+            is_faculty_advisor
+        }
+    }
+    """
+)
+
+
 def get_enrollment(
     client: Client, user_id: str, semester_id: str
 ) -> Optional[Dict[str, Any]]:
     """Fetches a particular enrollment by user and semester IDs."""
-    query = gql(
-        """
-        query get_enrollment($user_id: uuid!, $semester_id: String!) {
-            enrollments(
-                limit: 1,
-                where: { user_id: { _eq: $user_id }, semester_id: { _eq: $semester_id } }
-            ) {
-                is_project_lead
-                is_coordinator
-                is_faculty_advisor
-            }
-        }
-        """
-    )
 
     enrollments = client.execute(
-        query, variable_values={"user_id": user_id, "semester_id": semester_id}
+        _GET_ENROLLMENT_QUERY,
+        variable_values={"user_id": user_id, "semester_id": semester_id},
     )["enrollments"]
     if len(enrollments) == 0:
         return None
@@ -244,24 +285,28 @@ def get_enrollment(
     return enrollments[0]
 
 
-def set_enrollment(client: Client, enrollment_data: Dict[str, Any]):
-    """Upsert a specific enrollment."""
-    query = gql(
-        """
-        mutation upsert_enrollment($enrollment_data: enrollments_insert_input!) {
-            insert_enrollments_one(
-                object: $enrollment_data,
-                on_conflict: {
-                    constraint: enrollments_pkey,
-                    update_columns: [credits, project_id, is_project_lead]
-                }
-            ) {
-                user_id
-                semester_id
+_SET_ENROLLMENT_QUERY = gql(
+    """
+    mutation upsert_enrollment($enrollment_data: enrollments_insert_input!) {
+        insert_enrollments_one(
+            object: $enrollment_data,
+            on_conflict: {
+                constraint: enrollments_pkey,
+                update_columns: [credits, project_id, is_project_lead]
             }
+        ) {
+            user_id
+            semester_id
         }
-    """
-    )
+    }
+"""
+)
+
 
-    result = client.execute(query, variable_values={"enrollment_data": enrollment_data})
+def set_enrollment(client: Client, enrollment_data: Dict[str, Any]):
+    """Upsert a specific enrollment."""
+
+    result = client.execute(
+        _SET_ENROLLMENT_QUERY, variable_values={"enrollment_data": enrollment_data}
+    )
     return cast(Dict[str, any], result["insert_enrollments_one"])
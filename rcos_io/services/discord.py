@@ -2,10 +2,13 @@
 This module contains constants and functions for interacting with the Discord API.
 """
 
+import json
 from typing import Any, Dict, Optional, TypedDict, Union, cast
 from typing_extensions import NotRequired
 import requests
-from rcos_io.services import settings
+from flask import current_app
+from redis.exceptions import RedisError
+from rcos_io.services import cache, settings
 
 DISCORD_VERSION_NUMBER = "10"
 DISCORD_API_ENDPOINT = f"https://discord.com/api/v{DISCORD_VERSION_NUMBER}"
@@ -18,6 +21,9 @@ DISCORD_AUTH_URL = (
     "&response_type=code&scope=identify%20guilds.join&prompt=none"
 )
 
+DISCORD_USER_CACHE_SECONDS = 60 * 5
+"""How long fetched Discord user info is cached in Redis before being refetched."""
+
 HEADERS = {
     "Authorization": f"Bot {settings.DISCORD_BOT_TOKEN}",
 }
@@ -169,6 +175,46 @@ def get_user(user_id: str) -> Union[DiscordUser, None]:
     return user
 
 
+def get_user_cached(user_id: str) -> Union[DiscordUser, None]:
+    """
+    Same as `get_user` but caches the user info in Redis
+    for `DISCORD_USER_CACHE_SECONDS` so repeat page views skip the Discord API.
+    Falls back to `get_user` if Redis is unavailable.
+
+    Args:
+        user_id: Discord user's unique account ID
+    Returns:
+        DiscordUser
+    Raises:
+        HTTPError on failed request (e.g. not found)
+    """
+    key = f"discord_user:{user_id}"
+    try:
+        cached_user: Optional[bytes] = cache.get_cache().get(key)
+    except RedisError as error:
+        # Redis is only a cache here, so ask Discord directly while it's down
+        current_app.logger.warning("Failed to read cached Discord user: %s", error)
+        return get_user(user_id)
+    if cached_user is not None:
+        return cast(DiscordUser, json.loads(cached_user))
+
+    user = get_user(user_id)
+    try:
+        cache.get_cache().setex(key, DISCORD_USER_CACHE_SECONDS, json.dumps(user))
+    except RedisError as error:
+        current_app.logger.warning("Failed to cache Discord user: %s", error)
+    return user
+
+
+def clear_user_cache(user_id: str):
+    """Removes a Discord user's cached info so the next `get_user_cached` refetches it."""
+    try:
+        cache.get_cache().delete(f"discord_user:{user_id}")
+    except RedisError as error:
+        # At worst the old info is shown until it expires
+        current_app.logger.warning("Failed to clear cached Discord user: %s", error)
+
+
 def create_user_dm_channel(user_id: str):
     """
     https://discord.com/developers/docs/resources/user#create-dm
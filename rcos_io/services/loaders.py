@@ -0,0 +1,44 @@
+"""
+This module contains request-scoped loaders which memoize database fetches
+so that looking up the same records several times in a request only queries Hasura once,
+e.g. `loaders.get_user`.
+
+Results are stored on `g`, so they're never shared across requests.
+"""
+
+import functools
+from typing import Any, Callable, Dict, TypeVar, cast
+from flask import g
+from gql import Client
+from rcos_io.services import database
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def request_cached(fetch: F) -> F:
+    """
+    Wraps a database fetch so that calling it again with the same arguments
+    during the same request reuses the first result instead of querying again.
+
+    Results are stored on `g`, so they're dropped along with the request.
+    """
+
+    @functools.wraps(fetch)
+    def wrapped_fetch(client: Client, *args: Any, **kwargs: Any):
+        results: Dict[Any, Any] = g.setdefault("request_cached_results", {})
+        key = (fetch.__name__, args, tuple(sorted(kwargs.items())))
+        if key not in results:
+            results[key] = fetch(client, *args, **kwargs)
+        return results[key]
+
+    return cast(F, wrapped_fetch)
+
+
+get_meeting = request_cached(database.get_meeting)
+"""Request cached version of `database.get_meeting`."""
+
+get_user = request_cached(database.get_user)
+"""Request cached version of `database.get_user`."""
+
+get_project = request_cached(database.get_project)
+"""Request cached version of `database.get_project`."""
@@ -1,7 +1,12 @@
 """This module contains utility functions used across the codebase."""
 
-from typing import List, Dict, Any, Optional
+import functools
+import time
+import uuid
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import date
+from flask import current_app, has_request_context, url_for
+from flask import request as current_request
 from flask.wrappers import Request
 from flask.sessions import SessionMixin
 
@@ -10,6 +15,78 @@ class NotFoundError(Exception):
     """Custom exception for when expected data was not found."""
 
 
+def ilike_contains(search: str) -> str:
+    """
+    Builds a Postgres `ILIKE` pattern that matches values containing `search`,
+    escaping `%`, `_` and `\\` so they're matched literally.
+    """
+    escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def is_uuid(value: str) -> bool:
+    """Determines whether a string is a UUID, e.g. before using it as a database ID."""
+    try:
+        uuid.UUID(value)
+    except ValueError:
+        return False
+    return True
+
+
+@functools.lru_cache(maxsize=4096)
+def _build_url(
+    host_url: str,
+    script_root: str,
+    blueprint: Optional[str],
+    endpoint: str,
+    values: Tuple[Tuple[str, Any], ...],
+) -> str:
+    return url_for(endpoint, **dict(values))
+
+
+def cached_url_for(endpoint: str, **values: Any) -> str:
+    """
+    Same as Flask's `url_for` but remembers built URLs, since views and templates
+    build the same handful of URLs on every request.
+
+    URLs are cached per host and script root so external URLs stay correct.
+    Falls back to `url_for` outside of a request or when given unhashable values.
+    """
+    if not has_request_context():
+        return url_for(endpoint, **values)
+
+    key = tuple(sorted(values.items()))
+    try:
+        hash(key)
+    except TypeError:
+        return url_for(endpoint, **values)
+
+    # Relative endpoints like ".detail" resolve against the current blueprint
+    blueprint = current_request.blueprint if endpoint.startswith(".") else None
+    return _build_url(
+        current_request.host_url, current_request.script_root, blueprint, endpoint, key
+    )
+
+
+_last_traceback_minute: Dict[str, int] = {}
+"""The last minute (since the epoch) a traceback was logged for each error type."""
+
+
+def log_gql_error(error: Exception):
+    """
+    Logs a GraphQL error raised while handling a request. The full traceback is only
+    logged for the first error of each type per minute, so a Hasura outage doesn't
+    have every request formatting its own stack trace.
+    """
+    key = type(error).__name__
+    minute = int(time.time() // 60)
+    if _last_traceback_minute.get(key) != minute:
+        _last_traceback_minute[key] = minute
+        current_app.logger.exception(error)
+    else:
+        current_app.logger.warning("gql error: %s", error)
+
+
 def get_active_semester(
     semesters: List[Dict[str, Any]], on_date: Optional[date] = date.today()
 ) -> Optional[Dict[str, Any]]:
@@ -46,13 +123,16 @@ def get_semester_by_id(
     return None
 
 
-def get_target_semester(request: Request, session: SessionMixin):
+def get_target_semester(
+    request: Request, session: SessionMixin, semesters: List[Dict[str, Any]]
+):
     """
     Determines the intended semester from the optional `semester_id` query parameter.
 
     Args:
         request: the current Flask request
         session: the current session object
+        semesters: list of all semester objects
     Returns:
         the target semester's ID or None if all semesters are desired
     Throws:
@@ -67,7 +147,7 @@ def get_target_semester(request: Request, session: SessionMixin):
 
     semester = None
     if semester_id:
-        semester = get_semester_by_id(session["semesters"], semester_id)
+        semester = get_semester_by_id(semesters, semester_id)
 
     if semester_id and not semester:
         raise NotFoundError(f"Semester {semester_id} not found")
@@ -0,0 +1,19 @@
+"""
+Shared pytest setup.
+
+`rcos_io.services.settings` requires every environment variable from `.env.example`
+at import time, so placeholder values are filled in for any that aren't set.
+Nothing here connects to Hasura, Redis, or Discord.
+"""
+
+import os
+from pathlib import Path
+
+for line in (Path(__file__).parent.parent / ".env.example").read_text().splitlines():
+    if line and not line.startswith("#"):
+        key, value = line.split("=", 1)
+        os.environ.setdefault(key, value)
+
+# The placeholder port isn't a number, but Redis clients are only created, not connected
+if not os.environ["REDISPORT"].isdigit():
+    os.environ["REDISPORT"] = "6379"
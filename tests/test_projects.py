@@ -0,0 +1,37 @@
+"""Tests for the projects blueprint."""
+
+from rcos_io.blueprints.projects import render_project_description
+
+
+def test_render_project_description_keeps_tables():
+    """GFM tables and strikethrough keep their structure."""
+    html = render_project_description(
+        "| Name | Done |\n| :--- | ---: |\n| Docs | ~~no~~ |\n"
+    )
+    assert "<table>" in html
+    assert "<thead>" in html
+    assert "<tbody>" in html
+    assert '<th align="left">Name</th>' in html
+    assert '<td align="right"><del>no</del></td>' in html
+
+
+def test_render_project_description_keeps_fenced_code():
+    """Fenced code blocks keep their language."""
+    html = render_project_description("```python\nprint('hi')\n```\n")
+    assert html == "<pre lang=\"python\"><code>print('hi')\n</code></pre>\n"
+
+
+def test_render_project_description_strips_unsafe_html():
+    """Scripts, javascript: links and event handlers are removed."""
+    html = render_project_description(
+        '<script>alert(1)</script><a href="javascript:alert(1)" onclick="x()">x</a>'
+    )
+    assert "<script>" not in html
+    assert "javascript:" not in html
+    assert "onclick" not in html
+
+
+def test_render_project_description_empty():
+    """Missing and blank descriptions render as nothing."""
+    assert render_project_description(None) == ""
+    assert render_project_description("  \n") == ""